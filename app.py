@@ -1,122 +1,33 @@
 # 🤖 Streamlit App for Sophisticated DCF Valuation and EPS Projection (Layout Enhanced)
 import streamlit as st
 import pandas as pd
-import openpyxl
 import numpy as np
-from collections import Counter
+import diagnostics
+from diagnostics import span
+from backtest import load_price_csv, run_backtest, statement_history, summarize_backtest
+from calculations import DEFAULT_ASSUMPTIONS, derive_assumptions
+from dcf_graph import DCF_ASSUMPTION_KEYS, DCF_SOURCES, build_dcf_graph, run_dcf_job
+from export import excel_report_bytes, valuation_report
+from jobs import job_runner
+from portfolio import PORTFOLIO_ASSUMPTIONS, load_portfolio, revalue_portfolio
+from monte_carlo import DEFAULT_SPREADS, MC_ASSUMPTIONS, run_monte_carlo
+from result_cache import result_cache, result_key
+from reverse_dcf import implied_assumption
+from tornado import DEFAULT_SHOCKS, TORNADO_ASSUMPTIONS, tornado
+from statement_store import STATEMENT_KEYS, load_statements, meta_value, statement_store
 
 st.set_page_config(page_title="Smart Investing App", layout="wide")
 
 st.title("🤖 Smart Investing App to model DCF and EPS")
 st.caption("📦 Version: 1.0 Stable")
 
-# Utility functions
-
-def format_column_headers(headers):
-    formatted = []
-    blank_counter = 1
-    for h in headers:
-        try:
-            h_parsed = pd.to_datetime(h)
-            formatted.append(h_parsed.strftime("%b-%Y"))
-        except:
-            if pd.notnull(h) and str(h).strip():
-                formatted.append(str(h))
-            else:
-                formatted.append(f"Unnamed_{blank_counter}")
-                blank_counter += 1
-    counts = Counter()
-    unique = []
-    for h in formatted:
-        counts[h] += 1
-        unique.append(f"{h}_{counts[h]}" if counts[h] > 1 else h)
-    return unique
-
-def extract_table(df, start_label, start_row_offset, col_count=11):
-    start_row = df[df.iloc[:, 0] == start_label].index[0]
-    header_row = start_row + start_row_offset
-    headers_raw = df.iloc[header_row, 0:col_count].tolist()
-    headers = format_column_headers(headers_raw)
-    column_names = headers
-    data_rows = []
-    for i in range(start_row+start_row_offset+1, df.shape[0]):
-        row = df.iloc[i, 0:col_count]
-        if row.isnull().all():
-            break
-        data_rows.append(row.tolist())
-
-    df_temp = pd.DataFrame(data_rows, columns=column_names)
-    df_temp = df_temp.loc[:, df_temp.iloc[0].notna()]
-    df_temp.fillna(0, inplace=True)
-    return df_temp
-
-# Modularized DCF Calculation
-def calculate_dcf(base_revenue, forecast_years, ebit_margin, depreciation_pct, capex_pct,
-                  interest_pct, wc_change_pct, tax_rate, shares, growth_rate_1_2,
-                  growth_rate_3_4_5, growth_rate_6):
-
-    discount_factors = [(1 + interest_pct / 100) ** year for year in range(1, forecast_years + 1)]
-    fcf_data = []
-    revenue = base_revenue
-    ebit = base_revenue * (ebit_margin / 100)
-    depreciation = base_revenue * (depreciation_pct / 100)
-    tax = ebit * (tax_rate / 100)
-    net_op_pat = ebit - tax
-    fcf_data.append(["Year 0", base_revenue, ebit, tax, net_op_pat, depreciation, 0, 0, 0, 0])
-
-    for year in range(1, forecast_years + 1):
-        if year <= 2:
-            revenue *= (1 + growth_rate_1_2 / 100)
-        elif year <= 5:
-            revenue *= (1 + growth_rate_3_4_5 / 100)
-        else:
-            revenue *= (1 + growth_rate_6 / 100)
-
-        ebit = revenue * (ebit_margin / 100)
-        depreciation = revenue * (depreciation_pct / 100)
-        tax = ebit * (tax_rate / 100)
-        net_op_pat = ebit - tax
-        capex = revenue * (capex_pct / 100)
-        wc_change = revenue * wc_change_pct / 100
-        fcf = net_op_pat + depreciation - capex - wc_change
-        pv_fcf = fcf / discount_factors[year - 1]
-        fcf_data.append([f"Year {year}", revenue, ebit, tax, net_op_pat, depreciation, capex, wc_change, fcf, pv_fcf])
-
-    return fcf_data
-
-
-
-def calculate_terminal_value(fcf, g, r, n):
-    tv = (fcf * (1 + g / 100)) / ((r / 100) - (g / 100))
-    return tv / ((1 + r / 100) ** n), tv
-
-
-def dcf_fair_value(base_revenue, forecast_years, ebit_margin, depreciation_pct, capex_pct, wc_change_pct,
-    tax_rate, interest_pct, shares, growth_1_5, growth_6, terminal_growth):
-    revenue = base_revenue    
-    total_pv_fcf = 0
-    for year in range(1, forecast_years + 1):
-        revenue *= (1 + growth_1_5 / 100)
-        ebit = revenue * (ebit_margin / 100)
-        tax = ebit * (tax_rate / 100)
-        dep = revenue * (depreciation_pct / 100)
-        capex = revenue * (capex_pct / 100)
-        wc = revenue * (wc_change_pct / 100)
-        fcf = ebit - tax + dep - capex - wc
-        pv_fcf = fcf / ((1 + interest_pct / 100) ** year)
-        total_pv_fcf += pv_fcf
-
-    final_fcf = fcf
-    pv_terminal, terminal_val = calculate_terminal_value(final_fcf, terminal_growth, interest_pct, forecast_years)
-    ev = total_pv_fcf + pv_terminal    
-    fv_per_share = ev / shares if shares else 0
-    terminal_weight = pv_terminal / ev * 100 if ev else 0
-    return fv_per_share, terminal_weight
-
-
-
 # Tabs for entire app
-tabs = st.tabs(["\U0001F4E5 Inputs", "\U0001F4B0 DCF Valuation", "\U0001F4C8 EPS Projection", "\U0001F5FE Data Checks"])
+diagnostics.bind_session(st.session_state)
+tab_names = ["\U0001F4E5 Inputs", "\U0001F4B0 DCF Valuation", "\U0001F4C8 EPS Projection", "\U0001F5FE Data Checks",
+             "\U0001F4C2 Portfolio"]
+if diagnostics.ENABLED:
+    tab_names.append("\U0001FA7A Diagnostics")
+tabs = st.tabs(tab_names)
 
 
 # --- INPUT TAB ---
@@ -126,117 +37,132 @@ with tabs[0]:
 
     if uploaded_file and st.button("📥 Import Data"):
         uploaded_file.seek(0)  # Reset pointer for pandas
-    try:
-        uploaded_file.seek(0)  # Ensure pointer is reset
-        wb = openpyxl.load_workbook(uploaded_file, data_only=True)
-        sheet = wb["Data Sheet"]
-        data = list(sheet.values)
-        df_all = pd.DataFrame(data)
-    except Exception as e:
-        st.error(f"❌ Error reading Excel file: {e}")
-        st.stop()
-
-    if df_all.isna().sum().sum() > 50:
-        st.warning("⚠️ Many empty cells found. If your sheet uses formulas, please ensure it was saved after calculation in Excel.")
-
-    st.session_state["company_name"] = df_all.iloc[0, 1] if pd.notna(df_all.iloc[0, 1]) else "Unknown Company"
-    st.session_state["annual_pl"] = extract_table(df_all, "PROFIT & LOSS", 1, 11)
-    st.session_state["balance_sheet"] = extract_table(df_all, "BALANCE SHEET", 1, 11)
-    st.session_state["cashflow"] = extract_table(df_all, "CASH FLOW:", 1, 11)
-    st.session_state["quarterly"] = extract_table(df_all, "Quarters", 1, 11)
-    st.session_state["meta"] = extract_table(df_all, "META", 0, 2)
-    st.session_state["data_imported"] = True
+    # Nothing to load until a workbook is uploaded; the other tabs (e.g. Portfolio) still render
+    if uploaded_file is not None:
+        try:
+            # Statements are stored once per process by content hash, so reruns with the same file skip
+            # openpyxl and sessions only hold references to the shared read-only frames
+            statements = load_statements(uploaded_file.getvalue())
+        except Exception as e:
+            st.error(f"❌ Error reading Excel file: {e}")
+            st.stop()
+
+        if statements.empty_cells > 50:
+            st.warning("⚠️ Many empty cells found. If your sheet uses formulas, please ensure it was saved after calculation in Excel.")
+
+        st.session_state["company_name"] = statements.company_name
+        st.session_state["workbook_hash"] = statements.content_hash
+        for key in STATEMENT_KEYS:
+            st.session_state[key] = statements[key].frame()
+        st.session_state["price_row"] = statements["price"].frame() if "price" in statements else None
+        st.session_state["data_imported"] = True
     
-    if st.session_state.get("data_imported"):
-        st.markdown("""
-        <div style='border: 1px solid #ddd; padding: 1rem; border-radius: 8px; background-color: #f9f9f9;'>
-        💡 <strong>Note on Assumptions:</strong><br>
-        Some of the input assumptions below are automatically calculated from the financial data you've uploaded. Others require your judgment.<br>
-        If you're unsure about what values to use, you can ask <strong>ChatGPT</strong> for help! Just provide the <strong>company name</strong> along with supporting documents like <em>annual reports, earnings transcripts, or investor presentations</em>, and it can guide you toward reasonable and safe assumptions.
-        </div>
-        """, unsafe_allow_html=True)
-        st.success(f"✅ Data imported for: {st.session_state['company_name']}")
+        if st.session_state.get("data_imported"):
+            st.markdown("""
+            <div style='border: 1px solid #ddd; padding: 1rem; border-radius: 8px; background-color: #f9f9f9;'>
+            💡 <strong>Note on Assumptions:</strong><br>
+            Some of the input assumptions below are automatically calculated from the financial data you've uploaded. Others require your judgment.<br>
+            If you're unsure about what values to use, you can ask <strong>ChatGPT</strong> for help! Just provide the <strong>company name</strong> along with supporting documents like <em>annual reports, earnings transcripts, or investor presentations</em>, and it can guide you toward reasonable and safe assumptions.
+            </div>
+            """, unsafe_allow_html=True)
+            st.success(f"✅ Data imported for: {st.session_state['company_name']}")
         
-        df = st.session_state["meta"].copy()
-        df.columns = ["Label", "Value"]
-        df = df.set_index("Label")
-        current_price = float(df.loc["Current Price", "Value"])
-        market_cap = float(df.loc["Market Capitalization", "Value"])
+            current_price = meta_value(st.session_state["meta"], "Current Price")
+            market_cap = meta_value(st.session_state["meta"], "Market Capitalization")
       
-        df = st.session_state["balance_sheet"].copy().set_index("Report Date")
-        share_outstanding_row = df.loc["No. of Equity Shares"].dropna()
-        
-        df = st.session_state["annual_pl"].copy().set_index("Report Date")
-        revenue_row = df.loc["Sales"].dropna()
-        tax_row = df.loc["Tax"].dropna()
-        depreciation_row = df.loc["Depreciation"].dropna()
-        try:
-            calculated_ebit = revenue_row[-1] - sum(df.loc[row].dropna()[-1] for row in [
-                "Raw Material Cost", "Change in Inventory", "Power and Fuel",
-                "Other Mfr. Exp", "Employee Cost", "Selling and admin", "Other Expenses"] if row in df.index)
-            latest_revenue = revenue_row[-1]
-            calculated_ebit_margin = round((calculated_ebit / latest_revenue) * 100, 1)
-            calculated_tax_rate = round((tax_row[-1]/calculated_ebit)*100,1)
-            calculated_depreciation_rate = round((depreciation_row[-1]/latest_revenue)*100,1)
-        except:
-            calculated_ebit = 0
-            calculated_ebit_margin = 0
-            calculated_tax_rate = 0
-        
-        try:
-              outstanding_shares = round(share_outstanding_row[-1]/10000000,2)
-        except:
-              outstanding_shares = 0
-          
-        with st.expander("🚀 Revenue Growth Assumptions"):
-            st.markdown("""
-                <div style='border: 1px solid #ddd; padding: 1rem; border-radius: 8px; background-color: #f9f9f9;'>
-                💡 <strong>Please enter these assumptions based on your judgement:</strong><br>    
-                </div>
-                """, unsafe_allow_html=True)
-            col1, col2, col3 = st.columns(3)
-            with col1:
-                st.session_state["user_growth_rate_yr_1_2"] = st.number_input("Growth Y1 & Y2 (%)", value=10.0, step=0.1, format="%.1f", help="Expected revenue growth for years 1 and 2")
-            with col2:
-                st.session_state["user_growth_rate_yr_3_4_5"] = st.number_input("Growth Y3 to Y5 (%)", value=10.0, step=0.1,help="Expected revenue growth for years 3 to 5")
-            with col3:
-                st.session_state["user_growth_rate_yr_6_onwards"] = st.number_input("Terminal Growth Rate (%)", value=4.0, step=0.1, help="Growth rate after forecast period")
-
+            derived = derive_assumptions(st.session_state["annual_pl"], st.session_state["balance_sheet"])
+            calculated_ebit_margin = derived["ebit_margin"]
+            calculated_tax_rate = derived["tax_rate"]
+            calculated_depreciation_rate = derived["depreciation_pct"]
+            outstanding_shares = derived["shares_outstanding"]
 
-        with st.expander("📊 Revenue & Cost Assumptions"):
-            col1, col2 = st.columns(2)
-            with col1:
+            with st.expander("🚀 Revenue Growth Assumptions"):
                 st.markdown("""
-                <div style='border: 1px solid #ddd; padding: 1rem; border-radius: 8px; background-color: #f9f9f9;'>
-                💡 <strong>These assumptions are calculated based on uploaded data, but you can change them if you want to!:<strong><br>    
-                </div>
-                """, unsafe_allow_html=True)
+                    <div style='border: 1px solid #ddd; padding: 1rem; border-radius: 8px; background-color: #f9f9f9;'>
+                    💡 <strong>Please enter these assumptions based on your judgement:</strong><br>    
+                    </div>
+                    """, unsafe_allow_html=True)
+                col1, col2, col3 = st.columns(3)
+                with col1:
+                    st.session_state["user_growth_rate_yr_1_2"] = st.number_input("Growth Y1 & Y2 (%)", value=DEFAULT_ASSUMPTIONS["user_growth_rate_yr_1_2"], step=0.1, format="%.1f", help="Expected revenue growth for years 1 and 2")
+                with col2:
+                    st.session_state["user_growth_rate_yr_3_4_5"] = st.number_input("Growth Y3 to Y5 (%)", value=DEFAULT_ASSUMPTIONS["user_growth_rate_yr_3_4_5"], step=0.1,help="Expected revenue growth for years 3 to 5")
+                with col3:
+                    st.session_state["user_growth_rate_yr_6_onwards"] = st.number_input("Terminal Growth Rate (%)", value=DEFAULT_ASSUMPTIONS["user_growth_rate_yr_6_onwards"], step=0.1, help="Growth rate after forecast period")
+
+
+            with st.expander("📊 Revenue & Cost Assumptions"):
+                col1, col2 = st.columns(2)
+                with col1:
+                    st.markdown("""
+                    <div style='border: 1px solid #ddd; padding: 1rem; border-radius: 8px; background-color: #f9f9f9;'>
+                    💡 <strong>These assumptions are calculated based on uploaded data, but you can change them if you want to!:<strong><br>    
+                    </div>
+                    """, unsafe_allow_html=True)
             
-                st.session_state["ebit_margin"] = st.number_input("EBIT Margin (%)", value=calculated_ebit_margin, step=0.1, help=f"Last actual EBIT margin: {calculated_ebit_margin}%" if calculated_ebit_margin else "EBIT not found in data")
-                st.session_state["depreciation_pct"] = st.number_input("Depreciation (% of Revenue)", value=calculated_depreciation_rate, step=0.1, help=f"Last actual depreciation ratio : {calculated_depreciation_rate}% or enter your assumption")
-                st.session_state["tax_rate"] = st.number_input("Tax Rate (%) of EBIT", value = calculated_tax_rate, step=0.1, help=f"Last actual Tax rate % of EBIT :{calculated_tax_rate}%")
-                st.session_state["shares_outstanding"] = st.number_input("Shares Outstanding (in Cr)", value=outstanding_shares, step=0.1, help=f"Last actual total number of outstanding equity shares : {outstanding_shares} ")                       
+                    st.session_state["ebit_margin"] = st.number_input("EBIT Margin (%)", value=calculated_ebit_margin, step=0.1, help=f"Last actual EBIT margin: {calculated_ebit_margin}%" if calculated_ebit_margin else "EBIT not found in data")
+                    st.session_state["depreciation_pct"] = st.number_input("Depreciation (% of Revenue)", value=calculated_depreciation_rate, step=0.1, help=f"Last actual depreciation ratio : {calculated_depreciation_rate}% or enter your assumption")
+                    st.session_state["tax_rate"] = st.number_input("Tax Rate (%) of EBIT", value = calculated_tax_rate, step=0.1, help=f"Last actual Tax rate % of EBIT :{calculated_tax_rate}%")
+                    st.session_state["shares_outstanding"] = st.number_input("Shares Outstanding (in Cr)", value=outstanding_shares, step=0.1, help=f"Last actual total number of outstanding equity shares : {outstanding_shares} ")                       
 
                 
-            with col2:
-                st.markdown("""
-                <div style='border: 1px solid #ddd; padding: 1rem; border-radius: 8px; background-color: #f9f9f9;'>
-                💡 <strong>Update these assumptions based on your judgement:<strong><br>    
-                </div>
-                """, unsafe_allow_html=True)
+                with col2:
+                    st.markdown("""
+                    <div style='border: 1px solid #ddd; padding: 1rem; border-radius: 8px; background-color: #f9f9f9;'>
+                    💡 <strong>Update these assumptions based on your judgement:<strong><br>    
+                    </div>
+                    """, unsafe_allow_html=True)
             
-                st.session_state["forecast_years"] = st.number_input("Forecast Period (Years)", 1, 15, 5, step=1,help="Projection time horizon for future FCF")
-                st.session_state["interest_pct"] = st.number_input("WACC (%)", value=10.0, step=0.1, help="Weighted Average Cost of Capital to discount future cashflows")
-                st.session_state["wc_change_pct"] = st.number_input("Working Capital Changes (% of Revenue)", value=2.0, step=0.1, help="Assumed working capital requirement as % of revenue")
-                st.session_state["capex_pct"] = st.number_input("CapEx (% of Revenue)", value=2.0, step=0.1, help="User needs to update based on future CapEx plans")
+                    st.session_state["forecast_years"] = st.number_input("Forecast Period (Years)", 1, 15, DEFAULT_ASSUMPTIONS["forecast_years"], step=1,help="Projection time horizon for future FCF")
+                    st.session_state["interest_pct"] = st.number_input("WACC (%)", value=DEFAULT_ASSUMPTIONS["interest_pct"], step=0.1, help="Weighted Average Cost of Capital to discount future cashflows")
+                    st.session_state["wc_change_pct"] = st.number_input("Working Capital Changes (% of Revenue)", value=DEFAULT_ASSUMPTIONS["wc_change_pct"], step=0.1, help="Assumed working capital requirement as % of revenue")
+                    st.session_state["capex_pct"] = st.number_input("CapEx (% of Revenue)", value=DEFAULT_ASSUMPTIONS["capex_pct"], step=0.1, help="User needs to update based on future CapEx plans")
 
 # --- DCF TAB ---
 with tabs[1]:
     st.header("\U0001F4B0 DCF Valuation")
-    if st.session_state.get("data_imported") and st.button("Calculate DCF"):
-        df = st.session_state["annual_pl"].copy().set_index("Report Date")
-        revenue_row = df.loc["Sales"].dropna()
-        base_revenue = revenue_row.values[-1]
+    dcf_job = None
+    if st.session_state.get("data_imported"):
+        # Each node is memoized on its inputs for this session, so a rerun only recomputes
+        # the tables whose assumptions actually changed
+        graph = st.session_state.setdefault("dcf_graph", build_dcf_graph())
+        # Results are also persisted per workbook + assumption set, shared across processes and restarts
+        cache_key = result_key(st.session_state["workbook_hash"],
+                               {key: st.session_state[key] for key in DCF_ASSUMPTION_KEYS})
+        jobs = st.session_state.setdefault("jobs", {})
+        # A calculation still running for inputs that have since changed is cancelled
+        job_runner.cancel_stale(jobs, "dcf", cache_key)
+        if st.button("Calculate DCF"):
+            # Clicking again while the same inputs are being calculated joins the running job
+            dcf_job = job_runner.submit(jobs, "dcf", cache_key, run_dcf_job, graph,
+                                        {key: st.session_state[key] for key in DCF_SOURCES}, result_cache, cache_key)
+            # Most valuations finish well within this, so they render on this run without polling
+            dcf_job.wait(timeout=0.5)
+        elif jobs.get("dcf") is not None and jobs["dcf"].key == cache_key:
+            dcf_job = jobs["dcf"]
+
+    if dcf_job is not None and not dcf_job.done:
+        @st.fragment(run_every=0.5)
+        def dcf_job_progress():
+            if dcf_job.done:
+                st.rerun()
+            st.progress(dcf_job.progress, text=f"Calculating DCF… {dcf_job.message}")
+            partial = dcf_job.partial()
+            for name, title in [("growth_sensitivity", "Scenario 1: 5-Year Revenue Growth Rate Sensitivity"),
+                                ("wacc_terminal_sensitivity", "Scenario 2: WACC vs Terminal Growth"),
+                                ("ebit_terminal_sensitivity", "Scenario 3: EBIT Margin vs Terminal Growth")]:
+                if name in partial:
+                    st.markdown(f"**📊 {title}**")
+                    st.dataframe(partial[name])
+
+        dcf_job_progress()
+    elif dcf_job is not None and dcf_job.status == "failed":
+        st.error(f"❌ DCF calculation failed: {dcf_job.error}")
+
+    if dcf_job is not None and dcf_job.status == "done":
+        dcf = dcf_job.result["dcf"]
+        from_result_cache = dcf_job.result["from_result_cache"]
+        base_revenue = dcf["base_revenue"]
 
         with st.expander("📋 Assumptions Used in DCF Calculation"):
             col1, col2, col3 = st.columns(3)
@@ -257,37 +183,21 @@ with tabs[1]:
                 st.write(f"**Growth Rate for Year 3, 4 and 5 (%):** {st.session_state['user_growth_rate_yr_3_4_5']}")
                 st.write(f"**Growth Rate from year 6 onwards (%):** {st.session_state['user_growth_rate_yr_6_onwards']}")
         
-        fcf_data = calculate_dcf(
-            base_revenue=base_revenue,
-            forecast_years=st.session_state["forecast_years"],
-            ebit_margin=st.session_state["ebit_margin"],
-            depreciation_pct=st.session_state["depreciation_pct"],
-            capex_pct=st.session_state["capex_pct"],
-            interest_pct=st.session_state["interest_pct"],
-            wc_change_pct=st.session_state["wc_change_pct"],
-            tax_rate=st.session_state["tax_rate"],
-            shares=st.session_state["shares_outstanding"],
-            growth_rate_1_2=st.session_state["user_growth_rate_yr_1_2"],
-            growth_rate_3_4_5=st.session_state["user_growth_rate_yr_3_4_5"],
-            growth_rate_6=st.session_state["user_growth_rate_yr_6_onwards"]
-        )
-
-        df_fcf = pd.DataFrame(fcf_data, columns=["Year", "Revenue", "EBIT", "Tax", "Net Operating PAT", "Depreciation", "CapEx", "Change in WC", "Free Cash Flow", "PV of FCF"])
-        st.dataframe(df_fcf.style.format({
-          "Revenue": "{:.2f}", "EBIT": "{:.2f}", "Tax": "{:.2f}", "Net Operating PAT": "{:.2f}", "Depreciation": "{:.2f}",
-          "CapEx": "{:.2f}", "Change in WC": "{:.2f}", "Free Cash Flow": "{:.2f}", "PV of FCF": "{:.2f}"
-        }))
-
-        final_fcf = fcf_data[-1][-2]
+        df_fcf = dcf["fcf_table"]
+        with span("render.fcf_table"):
+            st.dataframe(df_fcf.style.format({
+              "Revenue": "{:.2f}", "EBIT": "{:.2f}", "Tax": "{:.2f}", "Net Operating PAT": "{:.2f}", "Depreciation": "{:.2f}",
+              "CapEx": "{:.2f}", "Change in WC": "{:.2f}", "Free Cash Flow": "{:.2f}", "PV of FCF": "{:.2f}"
+            }))
+
+        valuation = dcf["valuation"]
+        final_fcf = valuation["final_fcf"]
         terminal_growth = st.session_state["user_growth_rate_yr_6_onwards"]
         interest_pct = st.session_state["interest_pct"]
-        forecast_years = st.session_state["forecast_years"]
         shares = st.session_state["shares_outstanding"]
-
-        terminal_value = (final_fcf * (1 + terminal_growth / 100)) / ((interest_pct / 100) - (terminal_growth / 100))
-        pv_terminal = terminal_value / ((1 + interest_pct / 100) ** forecast_years)
-        total_pv_fcf = sum(row[-1] for row in fcf_data[1:])
-        enterprise_value = total_pv_fcf + pv_terminal
+        terminal_value = valuation["terminal_value"]
+        pv_terminal = valuation["pv_terminal"]
+        enterprise_value = valuation["enterprise_value"]
         equity_value = enterprise_value
         fair_value_per_share = equity_value / shares if shares else 0
 
@@ -315,11 +225,8 @@ with tabs[1]:
 
         with st.expander("📊 Valuation Verdict Based on DCF", expanded=True):
           try:
-            df_meta = st.session_state["meta"].copy()
-            if df_meta.shape[1] == 2:
-                df_meta.columns = ["Label", "Value"]
-                df_meta = df_meta.set_index("Label")
-                current_price = float(df_meta.loc["Current Price", "Value"])
+            current_price = dcf["current_price"]
+            if current_price is not None:
     
                 diff_pct = ((fair_value_per_share - current_price) / current_price) * 100
         
@@ -348,23 +255,14 @@ with tabs[1]:
                     </div>
                     """, unsafe_allow_html=True)
             else:
-                st.warning("⚠️ Could not determine verdict. META sheet should have exactly 2 columns.")
+                st.warning("⚠️ Could not determine verdict. Current Price not found in META.")
           except Exception as e:
               st.warning(f"⚠️ Verdict unavailable. Error: {e}")
         # ---- Sensitivity Tables ----
         st.subheader("📈 Sensitivity Analysis")
     
-        base_revenue = revenue_row.values[-1]
-        forecast_years = st.session_state["forecast_years"]
-        shares = st.session_state["shares_outstanding"]
-        tax_rate = st.session_state["tax_rate"]
-        depreciation_pct = st.session_state["depreciation_pct"]
-        capex_pct = st.session_state["capex_pct"]
-        wc_change_pct = st.session_state["wc_change_pct"]
-        ebit_margin = st.session_state["ebit_margin"]
-        terminal_growth = st.session_state["user_growth_rate_yr_6_onwards"]
-        wacc = st.session_state["interest_pct"]
-    
+        base_value = dcf["base_value"]
+
         def style_fair(val):
             diff_pct = ((val - base_value) / base_value) * 100
             if diff_pct > 10:
@@ -376,53 +274,222 @@ with tabs[1]:
     
         # 1️⃣ Table: Fair Value vs 5-Year Growth
         st.markdown("### 📊 Scenario 1: 5-Year Revenue Growth Rate Sensitivity")
-        growth_scenarios = [5, 10, 14, 16, 25]
-        data1 = []
-        base_growth = 10  # or any value in growth_scenarios you want as baseline
-        base_value, base_tv_weight = dcf_fair_value(base_revenue, forecast_years, ebit_margin, depreciation_pct,
-                            capex_pct, wc_change_pct, tax_rate, wacc, shares, base_growth, base_growth, terminal_growth)
-
-    
-    
-        for g in growth_scenarios:
-            val, tv_pct = dcf_fair_value(base_revenue, forecast_years, ebit_margin, depreciation_pct,
-                                    capex_pct, wc_change_pct, tax_rate, wacc, shares, g, g, terminal_growth)
-            data1.append({"5Y Growth Rate": f"{g}%", "Fair Value (₹)": val, "Terminal % of EV": f"{tv_pct:.1f}%"})
-    
-        df1 = pd.DataFrame(data1)
-        st.dataframe(df1.style.applymap(style_fair, subset=["Fair Value (₹)"]).format({"Fair Value (₹)": "₹{:.2f}"}))
+        df1 = dcf["growth_sensitivity"]
+        with span("render.sensitivity"):
+            st.dataframe(df1.style.applymap(style_fair, subset=["Fair Value (₹)"]).format({"Fair Value (₹)": "₹{:.2f}"}))
     
         # 2️⃣ Table: WACC vs Terminal Growth
         st.markdown("### 📊 Scenario 2: WACC vs Terminal Growth")
-        waccs = [7, 9, 11, 13]
-        terminal_gs = [4, 7, 10, 12]
-        matrix2 = []
-        for w in waccs:
-            row = []
-            for tg in terminal_gs:
-                val, _ = dcf_fair_value(base_revenue, forecast_years, ebit_margin, depreciation_pct, capex_pct,
-                                        wc_change_pct, tax_rate, w, shares, 10, 10, tg)
-                row.append(val)
-            matrix2.append(row)
-    
-        df2 = pd.DataFrame(matrix2, index=[f"WACC = {w}%" for w in waccs], columns=[f"Terminal Growth = {g}%" for g in terminal_gs])
-        st.dataframe(df2.style.applymap(style_fair).format("₹{:.2f}"))
+        df2 = dcf["wacc_terminal_sensitivity"]
+        with span("render.sensitivity"):
+            st.dataframe(df2.style.applymap(style_fair).format("₹{:.2f}"))
     
         # 3️⃣ Table: EBIT vs Terminal Growth
         st.markdown("### 📊 Scenario 3: EBIT Margin vs Terminal Growth")
-        ebit_margins = [8, 12, 16, 20, 25]
-        tg_values = [4, 7, 10, 12]
-        matrix3 = []
-        for em in ebit_margins:
-            row = []
-            for tg in tg_values:
-                val, _ = dcf_fair_value(base_revenue, forecast_years, em, depreciation_pct, capex_pct,
-                                        wc_change_pct, tax_rate, wacc, shares, 10, 10, tg)
-                row.append(val)
-            matrix3.append(row)
-    
-        df3 = pd.DataFrame(matrix3, index=[f"EBIT Margin = {e}%" for e in ebit_margins], columns=[f"Terminal Growth = {g}%" for g in tg_values])
-        st.dataframe(df3.style.applymap(style_fair).format("₹{:.2f}"))
+        df3 = dcf["ebit_terminal_sensitivity"]
+        with span("render.sensitivity"):
+            st.dataframe(df3.style.applymap(style_fair).format("₹{:.2f}"))
+        if from_result_cache:
+            st.caption("Loaded from the valuation result cache")
+        else:
+            recomputed = dcf_job.result["recomputed"]
+            st.caption(f"Recomputed {len(recomputed)} of {len(graph.nodes)} steps on this run" +
+                       (f": {', '.join(recomputed)}" if recomputed else ""))
+
+        company_name = str(st.session_state.get("company_name", "valuation"))
+        # The workbook only changes with the valuation, so build it once per cache_key, not every rerun
+        excel_report = st.session_state.get("excel_report")
+        if excel_report is None or excel_report[0] != cache_key:
+            with span("export.excel"):
+                report = valuation_report(company_name, {key: st.session_state[key] for key in DCF_ASSUMPTION_KEYS}, dcf)
+                excel_report = (cache_key, excel_report_bytes([report]))
+            st.session_state["excel_report"] = excel_report
+        st.download_button("📥 Download Excel Report", excel_report[1], file_name=f"{company_name} DCF.xlsx",
+                           mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet")
+
+    # ---- Monte Carlo Simulation ----
+    if st.session_state.get("data_imported"):
+        with st.expander("🎲 Monte Carlo Simulation"):
+            st.caption("Each assumption is drawn from a normal distribution centred on your Inputs tab value. Set the spread (standard deviation, in % points) for each one.")
+            spreads = {}
+            spread_cols = st.columns(4)
+            for i, (key, label) in enumerate(MC_ASSUMPTIONS.items()):
+                with spread_cols[i % 4]:
+                    spreads[key] = st.number_input(f"± {label}", value=DEFAULT_SPREADS[key], min_value=0.0, step=0.1, key=f"mc_spread_{key}")
+            mc_paths = st.select_slider("Simulation Paths", options=[10_000, 100_000, 250_000, 500_000, 1_000_000], value=100_000)
+
+            if st.button("Run Simulation"):
+                base_revenue = st.session_state["annual_pl"].loc["Sales"].dropna().values[-1]
+                try:
+                    current_price = meta_value(st.session_state["meta"], "Current Price")
+                except Exception:
+                    current_price = None
+
+                mc_assumptions = {
+                    "growth_rate_1_2": st.session_state["user_growth_rate_yr_1_2"],
+                    "growth_rate_3_4_5": st.session_state["user_growth_rate_yr_3_4_5"],
+                    "ebit_margin": st.session_state["ebit_margin"],
+                    "interest_pct": st.session_state["interest_pct"],
+                    "terminal_growth": st.session_state["user_growth_rate_yr_6_onwards"],
+                    "capex_pct": st.session_state["capex_pct"],
+                    "wc_change_pct": st.session_state["wc_change_pct"],
+                    "depreciation_pct": st.session_state["depreciation_pct"],
+                    "tax_rate": st.session_state["tax_rate"],
+                }
+                with span("monte_carlo"):
+                    mc = run_monte_carlo(base_revenue, st.session_state["forecast_years"], mc_assumptions, spreads,
+                                         st.session_state["shares_outstanding"], current_price, paths=mc_paths)
+
+                if not mc["valid_paths"]:
+                    st.warning("⚠️ No valid paths: WACC must stay above the terminal growth rate.")
+                else:
+                    col1, col2, col3, col4 = st.columns(4)
+                    col1.metric("P5 Fair Value", f"₹{mc['p5']:,.2f}")
+                    col2.metric("P50 Fair Value", f"₹{mc['p50']:,.2f}")
+                    col3.metric("P95 Fair Value", f"₹{mc['p95']:,.2f}")
+                    if "prob_undervalued" in mc:
+                        col4.metric("Probability Undervalued", f"{mc['prob_undervalued'] * 100:.1f}%",
+                                    help=f"Share of paths with fair value above the current price of ₹{current_price:,.2f}")
+                    edges = mc["hist_edges"]
+                    df_hist = pd.DataFrame({"Paths": mc["hist_counts"]},
+                                           index=pd.Index(np.round((edges[:-1] + edges[1:]) / 2, 2), name="Fair Value (₹)"))
+                    st.bar_chart(df_hist)
+                    st.caption(f"{mc['valid_paths']:,} of {mc['paths']:,} paths valid (WACC above terminal growth).")
+
+        # ---- Reverse DCF ----
+        with st.expander("🔁 Reverse DCF: What Is the Market Pricing In?"):
+            try:
+                current_price = meta_value(st.session_state["meta"], "Current Price")
+            except Exception:
+                current_price = None
+
+            if not current_price:
+                st.warning("⚠️ Current Price not found in META, so implied assumptions cannot be solved.")
+            else:
+                growth_1_5 = st.session_state["user_growth_rate_yr_1_2"]
+                model = {
+                    "base_revenue": st.session_state["annual_pl"].loc["Sales"].dropna().values[-1],
+                    "forecast_years": st.session_state["forecast_years"],
+                    "ebit_margin": st.session_state["ebit_margin"],
+                    "depreciation_pct": st.session_state["depreciation_pct"],
+                    "capex_pct": st.session_state["capex_pct"],
+                    "wc_change_pct": st.session_state["wc_change_pct"],
+                    "tax_rate": st.session_state["tax_rate"],
+                    "interest_pct": st.session_state["interest_pct"],
+                    "shares": st.session_state["shares_outstanding"],
+                    "growth_1_5": growth_1_5,
+                    "growth_6": growth_1_5,
+                    "terminal_growth": st.session_state["user_growth_rate_yr_6_onwards"],
+                }
+                st.caption(f"Each value below is solved on its own, holding the other Inputs tab assumptions fixed (revenue growth {growth_1_5}% for every forecast year), so that the DCF fair value equals the current price of ₹{current_price:,.2f}.")
+
+                # Solve only when the price or an assumption changed, not on every rerun of the page
+                waccs = np.arange(7, 14)
+                reverse_key = (current_price, tuple(model.items()))
+                reverse_dcf = st.session_state.get("reverse_dcf")
+                if reverse_dcf is None or reverse_dcf[0] != reverse_key:
+                    with span("reverse_dcf"):
+                        solves = {solve_for: implied_assumption(current_price, solve_for, model)
+                                  for solve_for in ["growth_1_5", "ebit_margin", "interest_pct"]}
+                        surface = implied_assumption(current_price, "growth_1_5", {**model, "interest_pct": waccs})
+                    reverse_dcf = (reverse_key, solves, surface)
+                    st.session_state["reverse_dcf"] = reverse_dcf
+                _, solves, surface = reverse_dcf
+
+                col1, col2, col3 = st.columns(3)
+                for col, (solve_for, label) in zip([col1, col2, col3], [("growth_1_5", "Implied Revenue Growth"),
+                                                                        ("ebit_margin", "Implied EBIT Margin"),
+                                                                        ("interest_pct", "Implied WACC")]):
+                    solved = solves[solve_for]
+                    if solved["bracketed"]:
+                        col.metric(label, f"{float(solved['value']):.2f}%")
+                        col.caption(f"{int(solved['iterations'])} iterations, residual ₹{abs(float(solved['residual'])):.2e}")
+                    else:
+                        col.metric(label, "n/a", help="No solution inside the search range")
+
+                df_implied = pd.DataFrame({"Implied Revenue Growth (%)": surface["value"], "Iterations": surface["iterations"]},
+                                          index=[f"WACC = {w}%" for w in waccs])
+                st.dataframe(df_implied.style.format({"Implied Revenue Growth (%)": "{:.2f}"}, na_rep="n/a"))
+
+        # ---- Tornado ----
+        with st.expander("🌪️ Tornado: Which Assumption Moves Fair Value Most?"):
+            st.caption("Each assumption is moved down and up by the amount below while every other Inputs tab value is held fixed. All scenarios are valued in one batch.")
+            shocks = {}
+            shock_cols = st.columns(5)
+            for i, (key, label) in enumerate(TORNADO_ASSUMPTIONS.items()):
+                with shock_cols[i % 5]:
+                    if key == "forecast_years":
+                        shocks[key] = st.number_input(f"± {label}", value=DEFAULT_SHOCKS[key], min_value=0, step=1, key=f"tornado_shock_{key}")
+                    else:
+                        shocks[key] = st.number_input(f"± {label}", value=DEFAULT_SHOCKS[key], min_value=0.0, step=0.1, key=f"tornado_shock_{key}")
+            show_elasticities = st.checkbox("Show elasticities (% change in fair value per 1% change in the assumption)")
+
+            # Same memo as the reverse DCF: rerun the batch only when an input or a shock changed
+            tornado_inputs = (st.session_state["annual_pl"].loc["Sales"].dropna().values[-1],
+                              {key: st.session_state[key] for key in list(TORNADO_ASSUMPTIONS) + ["shares_outstanding"]},
+                              shocks, show_elasticities)
+            tornado_key = (tornado_inputs[0], tuple(tornado_inputs[1].items()), tuple(shocks.items()), show_elasticities)
+            tornado_result = st.session_state.get("tornado")
+            if tornado_result is None or tornado_result[0] != tornado_key:
+                with span("tornado"):
+                    tornado_result = (tornado_key, tornado(*tornado_inputs))
+                st.session_state["tornado"] = tornado_result
+            df_tornado = tornado_result[1]
+            st.bar_chart(df_tornado.set_index("label")[["change_low_pct", "change_high_pct"]]
+                         .rename(columns={"change_low_pct": "Assumption Down", "change_high_pct": "Assumption Up"}),
+                         horizontal=True, stack=False, y_label="Change in Fair Value (%)")
+            columns = {"label": "Assumption", "base": "Base", "low": "Low", "high": "High", "fair_value_low": "Fair Value at Low (₹)",
+                       "fair_value_high": "Fair Value at High (₹)", "swing": "Swing (₹)", "elasticity": "Elasticity"}
+            st.dataframe(df_tornado[[c for c in columns if c in df_tornado]].rename(columns=columns).style.format({
+                "Base": "{:.2f}", "Low": "{:.2f}", "High": "{:.2f}", "Fair Value at Low (₹)": "₹{:,.2f}",
+                "Fair Value at High (₹)": "₹{:,.2f}", "Swing (₹)": "₹{:,.2f}", "Elasticity": "{:+.3f}"}, na_rep="n/a"), hide_index=True)
+            st.caption(f"Base fair value ₹{df_tornado.attrs['base_value']:,.2f}. n/a marks a shock that takes WACC to or below terminal growth.")
+
+        # ---- Historical Backtest ----
+        with st.expander("🕰️ Historical Backtest"):
+            st.caption("Re-derives EBIT margin, tax rate, depreciation % and shares as of every reported year, values the company from that year with your other Inputs tab assumptions, and compares the fair value with the price observed later.")
+            col1, col2 = st.columns(2)
+            with col1:
+                horizon = st.selectbox("Compare With", [1, 2, 3, 5, None], index=0,
+                                       format_func=lambda h: "Current Price (META)" if h is None else f"Price {h} year{'s' if h > 1 else ''} later")
+                wacc_variants = st.multiselect("Also Test WACC (%)", [7, 8, 9, 11, 12, 13, 14])
+            with col2:
+                price_file = st.file_uploader("Price History CSV (optional)", type=["csv"], key="backtest_prices",
+                                              help="Columns: date, price. Used instead of the workbook's PRICE: row.")
+
+            if st.button("Run Backtest"):
+                frames = {key: st.session_state[key] for key in ["annual_pl", "balance_sheet", "meta"]}
+                frames["price"] = st.session_state.get("price_row")
+                try:
+                    prices = load_price_csv(price_file) if price_file is not None else None
+                except Exception as e:
+                    st.error(f"❌ Error reading price CSV: {e}")
+                    prices = None
+                user_assumptions = {key: st.session_state[key] for key in DEFAULT_ASSUMPTIONS}
+                variants = [user_assumptions] + [dict(user_assumptions, interest_pct=float(w)) for w in wacc_variants]
+
+                with span("backtest"):
+                    history = statement_history(frames, st.session_state["company_name"], prices, horizon)
+                    bt = run_backtest(history, variants)
+
+                if not np.isfinite(bt["price"]).any():
+                    st.warning("⚠️ No historical prices found. Add a PRICE: row to the Data Sheet or upload a price CSV.")
+                else:
+                    current = bt[bt["variant"] == 0].set_index("year")
+                    st.line_chart(current[["fair_value", "price"]].rename(columns={"fair_value": "DCF Fair Value", "price": "Price"}))
+                    df_bt = current[["price", "fair_value", "upside_pct", "verdict", "later_price", "realized_pct", "hit"]].copy()
+                    df_bt.columns = ["Price (₹)", "Fair Value (₹)", "Upside (%)", "Verdict", "Later Price (₹)", "Realized Return (%)", "Call Right?"]
+                    df_bt["Call Right?"] = df_bt["Call Right?"].map({1.0: "✅", 0.0: "❌"})
+                    st.dataframe(df_bt.style.format({"Price (₹)": "₹{:,.2f}", "Fair Value (₹)": "₹{:,.2f}", "Upside (%)": "{:+.1f}%",
+                                                     "Later Price (₹)": "₹{:,.2f}", "Realized Return (%)": "{:+.1f}%"}, na_rep="–"))
+
+                    summary = summarize_backtest(bt)
+                    if not summary.empty:
+                        summary.insert(1, "WACC (%)", [variants[v]["interest_pct"] for v in summary["variant"]])
+                        st.dataframe(summary.drop(columns="variant").rename(columns={
+                            "observations": "Years Scored", "calls": "Calls", "hit_rate_pct": "Hit Rate (%)",
+                            "median_abs_error_pct": "Median |Fair Value − Later Price| (%)",
+                            "upside_return_corr": "Rank Corr. Upside vs Return"}).style.format(precision=2), hide_index=True)
 
 
 # --- DATA CHECK TAB ---
@@ -443,8 +510,109 @@ with tabs[3]:
 
         st.subheader("💸 Cash Flow Statement")
         st.dataframe(st.session_state["cashflow"])
+
+        cache_stats = statement_store.stats()
+        st.caption(f"Statement store: {cache_stats['hits']} hits / {cache_stats['misses']} misses, {cache_stats['entries']} of {cache_stats['max_entries']} workbooks held ({cache_stats['bytes'] / 2 ** 20:,.1f} of {cache_stats['max_bytes'] / 2 ** 20:,.0f} MiB)")
     else:
         st.info("Please upload a file from the Inputs tab and click 'Import Data'.")
 
+# --- PORTFOLIO TAB ---
+with tabs[4]:
+    st.header("📂 Portfolio")
+    st.caption("Upload several Data Sheet workbooks to value a whole watchlist. Each company starts from the same assumptions the Inputs tab would derive; edit any cell to revalue just that company.")
+    portfolio_files = st.file_uploader("Upload Excel Files", type=["xlsx"], accept_multiple_files=True,
+                                       key="portfolio_files")
+    col1, col2 = st.columns(2)
+    if portfolio_files and col1.button("📥 Import Portfolio"):
+        progress = st.progress(0.0, text="Importing workbooks...")
+        with span("portfolio.import"):
+            entries = load_portfolio([(f.name, f.getvalue()) for f in portfolio_files],
+                                     lambda done, total: progress.progress(done / total, text=f"Imported {done} of {total} workbooks"))
+        progress.empty()
+
+        companies = st.session_state.setdefault("portfolio_companies", {})
+        assumptions = st.session_state.setdefault("portfolio_assumptions", {})
+        for entry in entries:
+            if "error" in entry:
+                st.error(f"❌ {entry['file']}: {entry['error']}")
+            elif entry["content_hash"] not in companies:
+                companies[entry["content_hash"]] = entry["statements"]
+                assumptions[entry["content_hash"]] = entry["assumptions"]
+        # The editor is rebuilt from the stored assumptions, which already include earlier edits
+        st.session_state.pop("portfolio_editor", None)
+    if st.session_state.get("portfolio_companies") and col2.button("🗑️ Clear Portfolio"):
+        for key in ["portfolio_companies", "portfolio_assumptions", "portfolio_results", "portfolio_editor"]:
+            st.session_state.pop(key, None)
+
+    companies = st.session_state.get("portfolio_companies")
+    if companies:
+        assumptions = st.session_state["portfolio_assumptions"]
+        df_assumptions = pd.DataFrame.from_dict(assumptions, orient="index")[list(PORTFOLIO_ASSUMPTIONS)]
+        df_assumptions.insert(0, "company_name", [str(companies[h].company_name) for h in df_assumptions.index])
+
+        st.subheader("✏️ Assumptions")
+        edited = st.data_editor(df_assumptions.rename(columns={"company_name": "Company", **PORTFOLIO_ASSUMPTIONS}),
+                                disabled=["Company"], hide_index=True, key="portfolio_editor")
+        edited.index = df_assumptions.index
+        for content_hash, row in edited.rename(columns={v: k for k, v in PORTFOLIO_ASSUMPTIONS.items()}).iterrows():
+            # A cleared cell keeps the company's previous value
+            updated = dict(assumptions[content_hash])
+            updated.update({key: float(row[key]) for key in PORTFOLIO_ASSUMPTIONS if not pd.isna(row[key])})
+            updated["forecast_years"] = int(updated["forecast_years"])
+            assumptions[content_hash] = updated
+
+        results = st.session_state.setdefault("portfolio_results", {})
+        with span("portfolio.revalue"):
+            recomputed = revalue_portfolio(companies, assumptions, results)
+
+        st.subheader("💰 Valuations")
+        df_portfolio = pd.DataFrame([{
+            "Company": row["company_name"],
+            "Fair Value (₹)": row.get("fair_value"),
+            "Current Price (₹)": row.get("current_price"),
+            "Upside (%)": row.get("upside_pct"),
+            "Terminal % of EV": row.get("terminal_weight"),
+            "Verdict": row.get("verdict", row.get("error", "Price not found")),
+        } for _, row in results.values()]).sort_values("Upside (%)", ascending=False, na_position="last")
+
+        def style_verdict(val):
+            return {"Undervalued": "background-color:#e6ffed", "Overvalued": "background-color:#ffe6e6",
+                    "Fairly Valued": "background-color:#f0f0f0"}.get(val, "")
+
+        st.dataframe(df_portfolio.style.applymap(style_verdict, subset=["Verdict"]).format({
+            "Fair Value (₹)": "₹{:,.2f}", "Current Price (₹)": "₹{:,.2f}", "Upside (%)": "{:+.1f}%",
+            "Terminal % of EV": "{:.1f}%"}, na_rep="–"), hide_index=True)
+        st.caption(f"{len(companies)} companies · revalued {len(recomputed)} this run")
+
+# --- DIAGNOSTICS TAB (only when DCF_DIAGNOSTICS is set) ---
+if diagnostics.ENABLED:
+    with tabs[-1]:
+        st.header("🩺 Diagnostics")
+        st.caption("Timings of the instrumented stages (workbook loading, table extraction, DCF steps, rendering). Each span is also logged as a JSON line to stderr.")
+        latency_format = {"p50_ms": "{:.3f}", "p95_ms": "{:.3f}", "p99_ms": "{:.3f}", "max_ms": "{:.3f}"}
+
+        st.subheader("⏱️ This Session")
+        stats = diagnostics.session_stats(st.session_state)
+        rows = stats.summary() if stats else []
+        if rows:
+            st.dataframe(pd.DataFrame(rows).set_index("span").style.format(latency_format))
+        else:
+            st.info("No spans recorded in this session yet.")
+
+        st.subheader("🖥️ Whole Process (all sessions)")
+        rows = diagnostics.process_stats.summary()
+        if rows:
+            st.dataframe(pd.DataFrame(rows).set_index("span").style.format(latency_format))
+
+        st.subheader("🧠 Session State Memory")
+        df_memory = pd.DataFrame(diagnostics.session_memory(st.session_state))
+        if not df_memory.empty:
+            st.caption(f"Session-owned: {df_memory.loc[~df_memory['shared'], 'bytes'].sum() / 1024:,.1f} KiB · "
+                       f"shared statement frames: {df_memory.loc[df_memory['shared'], 'bytes'].sum() / 1024:,.1f} KiB")
+            st.dataframe(df_memory.set_index("key"))
+
+        st.subheader("🗄️ Caches")
+        st.json({"statement_store": statement_store.stats(), "result_cache": result_cache.stats()})
+
 st.markdown("---")
 st.caption("Made with ❤️ by Paise De Pange for Smart Investing.")
@@ -0,0 +1,212 @@
+# Rolling historical backtest: re-derive the Inputs-tab assumptions as of every reported year, value
+# the company from that point and compare the fair value with the price observed later.
+#
+#   python backtest.py path/to/workbooks -o backtest.csv --horizon 3 --prices prices.csv
+#
+# Every company-year x assumption variant is valued in a single dcf_batch call.
+import argparse
+import sys
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from batch_valuation import find_workbooks
+from calculations import DEFAULT_ASSUMPTIONS, dcf_batch, derive_assumptions_history
+from file_loader import parse_data_sheet
+from statement_store import meta_value, statements_from_tables
+
+# Assumptions that come from the statements; any other Inputs-tab assumption is the user's judgement
+# and is taken from DEFAULT_ASSUMPTIONS or the variant
+DERIVED_KEYS = ["ebit_margin", "tax_rate", "depreciation_pct", "shares_outstanding"]
+
+
+# Local price history as a CSV with "date" and "price" columns, plus an optional "company" column
+# when one file covers several companies
+def load_price_csv(path_or_buffer):
+    prices = pd.read_csv(path_or_buffer)
+    prices.columns = [str(c).strip().lower() for c in prices.columns]
+    prices["date"] = pd.to_datetime(prices["date"])
+    return prices.dropna(subset=["price"]).sort_values("date")
+
+
+def _year_end_dates(columns):
+    return pd.to_datetime(pd.Series(columns, dtype=object), format="%b-%Y", errors="coerce") + pd.offsets.MonthEnd(0)
+
+
+# Last price on or before each year end, from the price CSV
+def _prices_asof(prices, dates):
+    found = pd.merge_asof(pd.DataFrame({"date": dates}).reset_index().dropna(subset=["date"]).sort_values("date"),
+                          prices[["date", "price"]], on="date")
+    values = np.full(len(dates), np.nan)
+    values[found["index"].to_numpy()] = found["price"].to_numpy(dtype=float)
+    return values
+
+
+# One row per reported year: the assumptions derived as of that year, the price at that year end
+# and the price `horizon` years later. With horizon=None the later price is META's Current Price.
+# frames are the label-indexed statements (StatementSet.frames()), with "price" when the sheet has
+# a PRICE: row.
+def statement_history(frames, company_name, prices=None, horizon=1):
+    history = derive_assumptions_history(frames["annual_pl"], frames["balance_sheet"])
+    dates = _year_end_dates(history.index)
+
+    if prices is not None:
+        if "company" in prices.columns:
+            prices = prices[prices["company"] == company_name]
+        price = _prices_asof(prices, dates)
+    elif frames.get("price") is not None:
+        price = frames["price"].iloc[0].reindex(history.index).to_numpy(dtype=float)
+        price[price <= 0] = np.nan
+    else:
+        price = np.full(len(history), np.nan)
+
+    if horizon is None:
+        try:
+            later_price = np.full(len(history), meta_value(frames["meta"], "Current Price"))
+        except Exception:
+            later_price = np.full(len(history), np.nan)
+    else:
+        later_price = np.full(len(history), np.nan)
+        if horizon < len(history):
+            later_price[:len(history) - horizon] = price[horizon:]
+
+    history.insert(0, "company_name", str(company_name))
+    history.insert(1, "year", history.index)
+    history["price"] = price
+    history["later_price"] = later_price
+    return history.reset_index(drop=True)
+
+
+# Value every history row under every variant in one broadcast call. variants is a list of dicts
+# overriding any Inputs-tab assumption (including derived ones); keys a variant leaves out keep
+# the per-year derived value or the default.
+def run_backtest(history, variants=None, defaults=DEFAULT_ASSUMPTIONS):
+    variants = variants or [{}]
+
+    def grid(key, base):
+        column = np.array([variant.get(key, np.nan) for variant in variants], dtype=float)[None, :]
+        return np.where(np.isnan(column), np.asarray(base, dtype=float)[:, None], column)
+
+    rows = len(history)
+    values = {key: grid(key, history[key].to_numpy(dtype=float)) for key in DERIVED_KEYS}
+    values.update({key: grid(key, np.full(rows, float(value))) for key, value in defaults.items()})
+    terminal_growth = values["user_growth_rate_yr_6_onwards"]
+    result = dcf_batch(history["base_revenue"].to_numpy(dtype=float)[:, None],
+                       values["forecast_years"].astype(int), values["ebit_margin"], values["depreciation_pct"],
+                       values["capex_pct"], values["wc_change_pct"], values["tax_rate"], values["interest_pct"],
+                       values["user_growth_rate_yr_1_2"], values["user_growth_rate_yr_3_4_5"], terminal_growth,
+                       terminal_growth, values["shares_outstanding"])
+
+    price = history["price"].to_numpy(dtype=float)[:, None]
+    later_price = history["later_price"].to_numpy(dtype=float)[:, None]
+    fair_value = result["fair_value"]
+    with np.errstate(divide="ignore", invalid="ignore"):
+        upside_pct = (fair_value - price) / price * 100
+        realized_pct = np.broadcast_to((later_price - price) / price * 100, fair_value.shape)
+        fair_value_error_pct = (fair_value - later_price) / later_price * 100
+    # Same ±10% bands as valuation_verdict
+    verdict = np.select([upside_pct > 10, upside_pct < -10, np.isfinite(upside_pct)],
+                        ["Undervalued", "Overvalued", "Fairly Valued"], "No Price")
+    hit = np.where(verdict == "Undervalued", realized_pct > 0,
+                   np.where(verdict == "Overvalued", realized_pct < 0, np.nan))
+    hit = np.where(np.isfinite(realized_pct), hit, np.nan)
+
+    columns = [c for c in ["file", "company_name", "year", "price", "later_price", "base_revenue"] if c in history]
+    results = history.loc[np.repeat(np.arange(rows), len(variants)), columns]
+    results.insert(columns.index("year") + 1, "variant", np.tile(np.arange(len(variants)), rows))
+    for key in DERIVED_KEYS + ["interest_pct", "user_growth_rate_yr_1_2", "user_growth_rate_yr_3_4_5",
+                               "user_growth_rate_yr_6_onwards"]:
+        results[key] = values[key].ravel()
+    results["fair_value"] = fair_value.ravel()
+    results["terminal_weight"] = result["terminal_weight"].ravel()
+    results["upside_pct"] = upside_pct.ravel()
+    results["verdict"] = verdict.ravel()
+    results["realized_pct"] = realized_pct.ravel()
+    results["fair_value_error_pct"] = fair_value_error_pct.ravel()
+    results["hit"] = hit.ravel()
+    return results.reset_index(drop=True)
+
+
+# Per-variant scorecard: how often the verdict called the later move right, how far the fair value
+# was from the later price, and how well upside ranked the realized returns
+def summarize_backtest(results):
+    scored = results[np.isfinite(results["realized_pct"]) & np.isfinite(results["upside_pct"])]
+    rows = []
+    for variant, group in scored.groupby("variant"):
+        calls = group["hit"].dropna()
+        rows.append({
+            "variant": variant,
+            "observations": len(group),
+            "calls": len(calls),
+            "hit_rate_pct": calls.mean() * 100 if len(calls) else np.nan,
+            "median_abs_error_pct": group["fair_value_error_pct"].abs().median(),
+            # Spearman rank correlation, without requiring scipy
+            "upside_return_corr": group["upside_pct"].rank().corr(group["realized_pct"].rank()),
+        })
+    return pd.DataFrame(rows)
+
+
+def workbook_history(path, prices=None, horizon=1):
+    with open(path, "rb") as f:
+        statements = statements_from_tables(parse_data_sheet(f.read()))
+    history = statement_history(statements.frames(), statements.company_name, prices, horizon)
+    history.insert(0, "file", path)
+    return history
+
+
+# The price CSV can cover the whole universe, so each worker receives it once at start-up rather
+# than with every workbook
+_worker_prices = None
+
+
+def _init_worker(prices):
+    global _worker_prices
+    _worker_prices = prices
+
+
+def _try_workbook_history(path, horizon):
+    try:
+        return workbook_history(path, _worker_prices, horizon), None
+    except Exception as e:
+        return None, f"{type(e).__name__}: {e}"
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Backtest the DCF over every reported year of each Data Sheet workbook.")
+    parser.add_argument("target", help="Directory of .xlsx files or a glob pattern")
+    parser.add_argument("-o", "--output", default="backtest.csv", help="Output file (.csv or .parquet)")
+    parser.add_argument("--horizon", type=int, default=1, help="Years until the price the fair value is compared with (0 = META Current Price)")
+    parser.add_argument("--prices", help="Optional CSV of date,price[,company] used instead of the PRICE: row")
+    parser.add_argument("-w", "--workers", type=int, default=None, help="Worker processes for parsing (default: CPU count)")
+    args = parser.parse_args(argv)
+
+    paths = find_workbooks(args.target)
+    if not paths:
+        parser.error(f"No workbooks found for {args.target!r}")
+    prices = load_price_csv(args.prices) if args.prices else None
+
+    # Parsing dominates, so it fans out over processes; the valuation itself is one batch call
+    histories = []
+    horizon = args.horizon or None
+    with ProcessPoolExecutor(max_workers=args.workers, initializer=_init_worker, initargs=(prices,)) as executor:
+        for path, (history, error) in zip(paths, executor.map(_try_workbook_history, paths, [horizon] * len(paths),
+                                                                chunksize=16)):
+            if error:
+                print(f"✗ {path}: {error}", file=sys.stderr)
+            else:
+                histories.append(history)
+    if not histories:
+        return 1
+
+    results = run_backtest(pd.concat(histories, ignore_index=True))
+    if args.output.lower().endswith(".parquet"):
+        results.to_parquet(args.output, index=False)
+    else:
+        results.to_csv(args.output, index=False)
+    print(summarize_backtest(results).to_string(index=False), file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
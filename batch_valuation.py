@@ -0,0 +1,248 @@
+# Headless batch valuation over a folder (or glob) of Screener "Data Sheet" workbooks.
+#
+#   python batch_valuation.py path/to/workbooks -o results.csv --workers 8
+#   python batch_valuation.py "exports/*.xlsx" -o results.parquet
+#
+# Each workbook is valued with the same defaults the Inputs tab derives, results are written as
+# each file finishes and failures are reported per file without stopping the batch.
+import argparse
+import csv
+import glob
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from concurrent.futures.process import BrokenProcessPool
+
+from calculations import DEFAULT_ASSUMPTIONS, derive_assumptions, valuation_verdict, value_assumptions
+from file_loader import parse_data_sheet
+from statement_store import meta_value, statements_from_tables
+
+RESULT_COLUMNS = [
+    "file", "company_name", "status", "error", "base_revenue", "ebit_margin", "tax_rate", "depreciation_pct",
+    "shares_outstanding", "enterprise_value", "fair_value", "terminal_weight", "current_price", "upside_pct",
+    "verdict", "seconds",
+]
+TEXT_COLUMNS = {"file", "company_name", "status", "error", "verdict"}
+
+
+# Base revenue plus the assumptions the Inputs tab would start from for these statements
+def statement_assumptions(statements):
+    frames = statements.frames()
+    assumptions = dict(DEFAULT_ASSUMPTIONS)
+    derived = derive_assumptions(frames["annual_pl"], frames["balance_sheet"])
+    assumptions.update({key: derived[key] for key in ["ebit_margin", "tax_rate", "depreciation_pct",
+                                                       "shares_outstanding"]})
+    return derived["base_revenue"], assumptions
+
+
+# Value one company from its statements; overrides replace any Inputs-tab assumption
+def value_statements(statements, overrides=None):
+    frames = statements.frames()
+    base_revenue, assumptions = statement_assumptions(statements)
+    assumptions.update(overrides or {})
+    result = value_assumptions(base_revenue, assumptions)
+
+    row = {
+        "company_name": str(statements.company_name),
+        "base_revenue": float(base_revenue),
+        "ebit_margin": float(assumptions["ebit_margin"]),
+        "tax_rate": float(assumptions["tax_rate"]),
+        "depreciation_pct": float(assumptions["depreciation_pct"]),
+        "shares_outstanding": float(assumptions["shares_outstanding"]),
+        "enterprise_value": float(result["enterprise_value"]),
+        "fair_value": float(result["fair_value"]),
+        "terminal_weight": float(result["terminal_weight"]),
+    }
+    try:
+        current_price = meta_value(frames["meta"], "Current Price")
+    except Exception:
+        current_price = None
+    if current_price:
+        row["current_price"] = current_price
+        row["verdict"], row["upside_pct"] = valuation_verdict(row["fair_value"], current_price)
+    return row
+
+
+def value_workbook(path):
+    started = time.perf_counter()
+    try:
+        with open(path, "rb") as f:
+            row = value_statements(statements_from_tables(parse_data_sheet(f.read())))
+        row["status"] = "ok"
+    except Exception as e:
+        row = {"status": "error", "error": f"{type(e).__name__}: {e}"}
+    row["file"] = path
+    row["seconds"] = time.perf_counter() - started
+    return row
+
+
+def find_workbooks(target):
+    if os.path.isdir(target):
+        pattern = os.path.join(target, "*.xlsx")
+    else:
+        pattern = target
+    # Skip Excel lock files such as "~$Company.xlsx"
+    return sorted(p for p in glob.glob(pattern) if not os.path.basename(p).startswith("~$"))
+
+
+# flush_rows puts every row on disk as soon as it is written, for watching a long batch
+class CsvResultWriter:
+    def __init__(self, path, columns=RESULT_COLUMNS, flush_rows=True):
+        self.flush_rows = flush_rows
+        self._file = open(path, "w", newline="", encoding="utf-8")
+        self._writer = csv.DictWriter(self._file, fieldnames=columns, extrasaction="ignore")
+        self._writer.writeheader()
+
+    def write(self, row):
+        self._writer.writerow(row)
+        if self.flush_rows:
+            self._file.flush()
+
+    # Many rows at once from equal-length columns, without building a dict per row
+    def write_columns(self, columns):
+        rows = zip(*(columns.get(name, [None] * len(next(iter(columns.values())))) for name in self._writer.fieldnames))
+        self._writer.writer.writerows(rows)
+
+    def close(self):
+        self._file.close()
+
+
+# Buffers rows into Parquet row groups so results land on disk while the batch is still running
+class ParquetResultWriter:
+    def __init__(self, path, columns=RESULT_COLUMNS, text_columns=TEXT_COLUMNS, row_group_size=256):
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        self._pa = pa
+        self.columns = columns
+        self._schema = pa.schema([(name, pa.string() if name in text_columns else pa.float64())
+                                  for name in columns])
+        self._writer = pq.ParquetWriter(path, self._schema)
+        self._rows = []
+        self._tables = []
+        self._pending = 0
+        self.row_group_size = row_group_size
+
+    def write(self, row):
+        self._rows.append({name: row.get(name) for name in self.columns})
+        self._pending += 1
+        if self._pending >= self.row_group_size:
+            self._flush()
+
+    # Many rows at once from equal-length columns; small calls are gathered into one row group
+    def write_columns(self, columns):
+        self._table_rows()
+        length = len(next(iter(columns.values())))
+        self._tables.append(self._pa.Table.from_pydict(
+            {name: columns.get(name, [None] * length) for name in self.columns}, schema=self._schema))
+        self._pending += length
+        if self._pending >= self.row_group_size:
+            self._flush()
+
+    def _table_rows(self):
+        if self._rows:
+            self._tables.append(self._pa.Table.from_pylist(self._rows, schema=self._schema))
+            self._rows = []
+
+    def _flush(self):
+        self._table_rows()
+        if self._tables:
+            self._writer.write_table(self._pa.concat_tables(self._tables))
+            self._tables = []
+            self._pending = 0
+
+    def close(self):
+        self._flush()
+        self._writer.close()
+
+
+def open_result_writer(path, columns=RESULT_COLUMNS, text_columns=TEXT_COLUMNS):
+    if path.lower().endswith(".parquet"):
+        return ParquetResultWriter(path, columns, text_columns)
+    return CsvResultWriter(path, columns)
+
+
+def _error_row(path, e):
+    return {"file": path, "status": "error", "error": f"{type(e).__name__}: {e}"}
+
+
+# A worker that dies (out of memory, a crash in openpyxl/lxml) breaks the pool and fails every file
+# still queued on it. Those files are retried one at a time on a fresh single-worker pool, so only the
+# file that actually kills its worker gets an error row.
+def _retry_isolated(paths):
+    executor = ProcessPoolExecutor(max_workers=1)
+    try:
+        for path in paths:
+            try:
+                yield executor.submit(value_workbook, path).result()
+            except BrokenProcessPool as e:
+                executor.shutdown(wait=False)
+                executor = ProcessPoolExecutor(max_workers=1)
+                yield _error_row(path, e)
+            except Exception as e:
+                yield _error_row(path, e)
+    finally:
+        executor.shutdown()
+
+
+def _valued_rows(paths, workers):
+    broken = []
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = {executor.submit(value_workbook, path): path for path in paths}
+        for future in as_completed(futures):
+            try:
+                yield future.result()
+            except BrokenProcessPool:
+                broken.append(futures[future])
+            except Exception as e:
+                yield _error_row(futures[future], e)
+    yield from _retry_isolated(sorted(broken))
+
+
+def run_batch(paths, output, workers=None, report_every=100, log=sys.stderr):
+    writer = open_result_writer(output)
+    started = time.perf_counter()
+    done = failed = 0
+    try:
+        for row in _valued_rows(paths, workers):
+            writer.write(row)
+            done += 1
+            if row["status"] != "ok":
+                failed += 1
+                print(f"✗ {row['file']}: {row['error']}", file=log)
+            if report_every and done % report_every == 0:
+                elapsed = time.perf_counter() - started
+                print(f"[{done}/{len(paths)}] {done / elapsed:.1f} files/sec", file=log)
+    finally:
+        writer.close()
+
+    elapsed = time.perf_counter() - started
+    return {
+        "files": done,
+        "failed": failed,
+        "seconds": elapsed,
+        "files_per_sec": done / elapsed if elapsed else 0.0,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Value every Data Sheet workbook in a folder with the default DCF assumptions.")
+    parser.add_argument("target", help="Directory of .xlsx files or a glob pattern")
+    parser.add_argument("-o", "--output", default="valuations.csv", help="Output file (.csv or .parquet)")
+    parser.add_argument("-w", "--workers", type=int, default=None, help="Worker processes (default: CPU count)")
+    parser.add_argument("--report-every", type=int, default=100, help="Print throughput every N files (0 to disable)")
+    args = parser.parse_args(argv)
+
+    paths = find_workbooks(args.target)
+    if not paths:
+        parser.error(f"No workbooks found for {args.target!r}")
+
+    summary = run_batch(paths, args.output, args.workers, args.report_every)
+    print(f"Valued {summary['files']} files ({summary['failed']} failed) in {summary['seconds']:.2f}s "
+          f"— {summary['files_per_sec']:.1f} files/sec → {args.output}", file=sys.stderr)
+    return 1 if summary["failed"] == summary["files"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,162 @@
+# Rows-per-second and peak memory of the report export writers, written as JSON results.
+#
+#   python -m benchmarks.export_benchmark -o export_bench.json
+#   python -m benchmarks.export_benchmark --sizes 10k 100k 1m --companies 1000
+#
+# "surface" stages stream a WACC x growth fair-value surface of the given number of values; the
+# openpyxl_in_memory stage builds the same grid with a normal (not write-only) workbook for
+# comparison. "report" stages write full per-company reports (summary, assumptions, FCF table,
+# terminal value, sensitivity grids). Peak memory is the Python heap as seen by tracemalloc.
+import argparse
+import json
+import os
+import platform
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+
+import numpy as np
+import openpyxl
+import pyarrow as pa
+
+from batch_valuation import DEFAULT_ASSUMPTIONS
+from benchmarks.synthetic_workbook import data_sheet_bytes
+from export import REPORT_SECTIONS, ExcelReportWriter, TabularReportWriter, statement_report, surface_rows, write_surface
+from file_loader import parse_data_sheet
+from statement_store import statements_from_tables
+
+# Values in the surface; always 100 growth columns
+SIZES = {"10k": 10_000, "100k": 100_000, "1m": 1_000_000}
+SURFACE_COLUMNS = 100
+ASSUMPTIONS = dict(DEFAULT_ASSUMPTIONS, ebit_margin=18.0, tax_rate=25.0, depreciation_pct=4.0, shares_outstanding=12.5)
+
+
+def _surface_axes(values):
+    rows = values // SURFACE_COLUMNS
+    return np.linspace(9, 15, rows), np.linspace(0, 30, SURFACE_COLUMNS)
+
+
+def _openpyxl_in_memory(path, waccs, growths):
+    wb = openpyxl.Workbook()
+    ws = wb.active
+    ws.append(["interest_pct \\ user_growth_rate_yr_1_2"] + growths.tolist())
+    for wacc, fair_values in surface_rows(1000.0, ASSUMPTIONS, "interest_pct", waccs, "user_growth_rate_yr_1_2", growths):
+        ws.append([float(wacc)] + fair_values.tolist())
+    wb.save(path)
+
+
+def _reports(companies, distinct=8):
+    reports = [statement_report(statements_from_tables(parse_data_sheet(
+        data_sheet_bytes(company_name=f"Export {i}", seed=i)))) for i in range(distinct)]
+    return [{**reports[i % distinct], "company_name": f"Export {i}"} for i in range(companies)]
+
+
+def _report_rows(report):
+    dcf = report["dcf"]
+    sensitivity = sum(table.size for key, table in dcf.items() if key.endswith("_sensitivity"))
+    return 1 + len(report["assumptions"]) + len(dcf["fcf_table"]) + sensitivity
+
+
+def _write_reports(writer, reports):
+    for report in reports:
+        writer.write(report)
+    writer.close()
+
+
+def build_stages(size, workdir):
+    waccs, growths = _surface_axes(SIZES[size])
+    values = len(waccs) * len(growths)
+    stages = {}
+    for fmt in ["xlsx", "csv", "parquet"]:
+        path = os.path.join(workdir, f"surface.{fmt}")
+        stages[f"surface_{fmt}"] = (values, lambda path=path: write_surface(
+            path, 1000.0, ASSUMPTIONS, "interest_pct", waccs, "user_growth_rate_yr_1_2", growths))
+    path = os.path.join(workdir, "surface_in_memory.xlsx")
+    stages["surface_openpyxl_in_memory"] = (values, lambda: _openpyxl_in_memory(path, waccs, growths))
+    return stages
+
+
+def build_report_stages(companies, workdir):
+    reports = _reports(companies)
+    rows = sum(_report_rows(report) for report in reports)
+    stages = {"report_xlsx": (rows, lambda: _write_reports(
+        ExcelReportWriter(os.path.join(workdir, "report.xlsx")), reports))}
+    for fmt in ["csv", "parquet"]:
+        stages[f"report_{fmt}"] = (rows, lambda fmt=fmt: _write_reports(
+            TabularReportWriter(os.path.join(workdir, f"report.{fmt}")), reports))
+    return stages
+
+
+def time_stage(fn, rows, repeats):
+    timings = []
+    for _ in range(repeats):
+        t0 = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - t0)
+
+    tracemalloc.start()
+    fn()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    median = statistics.median(timings)
+    return {
+        "rows": rows,
+        "median_s": median,
+        "min_s": min(timings),
+        "repeats": len(timings),
+        "rows_per_sec": rows / median,
+        "peak_kib": peak / 1024,
+    }
+
+
+def _record(results, stage, size, rows, fn, repeats, log):
+    result = {"stage": stage, "size": size, **time_stage(fn, rows, repeats)}
+    results.append(result)
+    print(f"{size:>7} {stage:<28} {result['rows']:>10,} rows  {result['rows_per_sec']:>12,.0f} rows/s  "
+          f"peak {result['peak_kib']:10.1f} KiB", file=log)
+
+
+def run(sizes, companies=200, repeats=3, log=sys.stderr):
+    workdir = tempfile.mkdtemp(prefix="dcf-export-bench-")
+    results = []
+    try:
+        for size in sizes:
+            for stage, (rows, fn) in build_stages(size, workdir).items():
+                _record(results, stage, size, rows, fn, repeats, log)
+        for stage, (rows, fn) in build_report_stages(companies, workdir).items():
+            _record(results, stage, f"{companies}co", rows, fn, repeats, log)
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+    return {
+        "meta": {
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "python": platform.python_version(),
+            "numpy": np.__version__,
+            "openpyxl": openpyxl.__version__,
+            "pyarrow": pa.__version__,
+            "report_sections": list(REPORT_SECTIONS),
+        },
+        "results": results,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark streaming Excel, CSV and Parquet report export.")
+    parser.add_argument("-o", "--output", default="export_bench_results.json", help="Where to write the JSON results")
+    parser.add_argument("--sizes", nargs="+", default=["10k", "100k"], choices=list(SIZES),
+                        help="Fair-value surface sizes to stream")
+    parser.add_argument("--companies", type=int, default=200, help="Companies in the batch report stages")
+    parser.add_argument("--repeats", type=int, default=3, help="Timed runs per stage")
+    args = parser.parse_args(argv)
+
+    results = run(args.sizes, args.companies, args.repeats)
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(results, f, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
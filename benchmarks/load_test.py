@@ -0,0 +1,196 @@
+# Drives the real app.py headlessly with Streamlit's AppTest, one AppTest per simulated session and
+# all sessions sharing this process (and so the statement store and caches), like one server.
+#
+#   python -m benchmarks.load_test --sessions 1 2 4 8 --rounds 3 -o load.json
+#
+# Each session uploads its own synthetic workbook, clicks Import Data, tweaks WACC and the growth
+# rates, then clicks Calculate DCF, `rounds` times. Reports latency percentiles per interaction,
+# interactions/sec and RSS growth for every concurrency level.
+import argparse
+import io
+import json
+import os
+import platform
+import random
+import resource
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import streamlit as st
+from streamlit.testing.v1 import AppTest
+
+from benchmarks.synthetic_workbook import data_sheet_bytes
+
+APP_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "app.py")
+INTERACTIONS = ["first_load", "import_data", "tweak_assumptions", "calculate_dcf"]
+UPLOAD_KEY = "_load_test_upload"
+
+
+class _Upload(io.BytesIO):
+    name = "load_test.xlsx"
+
+
+# AppTest cannot drive st.file_uploader, so the Inputs uploader hands back whatever workbook the
+# harness put in that session's state; every other uploader stays empty
+def _patch_file_uploader():
+    def file_uploader(label, *args, **kwargs):
+        data = st.session_state.get(UPLOAD_KEY)
+        if label != "Upload Excel File" or data is None or kwargs.get("accept_multiple_files"):
+            return [] if kwargs.get("accept_multiple_files") else None
+        return _Upload(data)
+
+    st.file_uploader = file_uploader
+
+
+def rss_bytes():
+    try:
+        with open("/proc/self/status", encoding="ascii") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    # Peak rather than current RSS off Linux; still catches growth
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+def _button(at, text):
+    return next(b for b in at.button if text in b.label)
+
+
+def _number_input(at, label):
+    return next(n for n in at.number_input if n.label == label)
+
+
+# Calculate DCF runs as a background job; long ones finish on a later rerun, as the page's polling would
+def _calculate(at, timeout):
+    _button(at, "Calculate DCF").click().run()
+    deadline = time.perf_counter() + timeout
+    while not any(m.label == "Fair Value/Share" for m in at.metric) and not at.exception:
+        if time.perf_counter() > deadline:
+            raise TimeoutError("DCF job did not finish")
+        time.sleep(0.05)
+        at.run()
+
+
+def _timed(timings, name, fn):
+    started = time.perf_counter()
+    fn()
+    timings[name].append(time.perf_counter() - started)
+
+
+def run_session(workbook, rounds, timeout, seed):
+    rng = random.Random(seed)
+    timings = {name: [] for name in INTERACTIONS}
+    at = AppTest.from_file(APP_PATH, default_timeout=timeout)
+    at.session_state[UPLOAD_KEY] = workbook
+    _timed(timings, "first_load", at.run)
+    for _ in range(rounds):
+        _timed(timings, "import_data", lambda: _button(at, "Import Data").click().run())
+
+        def tweak():
+            _number_input(at, "WACC (%)").set_value(round(rng.uniform(8, 14), 1))
+            _number_input(at, "Growth Y1 & Y2 (%)").set_value(round(rng.uniform(5, 20), 1))
+            _number_input(at, "Growth Y3 to Y5 (%)").set_value(round(rng.uniform(5, 15), 1)).run()
+
+        _timed(timings, "tweak_assumptions", tweak)
+        _timed(timings, "calculate_dcf", lambda: _calculate(at, timeout))
+    errors = [str(e.value) for e in at.exception] + [str(e.value) for e in at.error]
+    return timings, errors
+
+
+def run_level(sessions, rounds, workbooks, timeout, log=sys.stderr):
+    rss_start = rss_bytes()
+    peak = [rss_start]
+    stop = threading.Event()
+
+    def sample_rss():
+        while not stop.wait(0.05):
+            peak[0] = max(peak[0], rss_bytes())
+
+    sampler = threading.Thread(target=sample_rss, daemon=True)
+    sampler.start()
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=sessions) as executor:
+        outcomes = list(executor.map(lambda i: run_session(workbooks[i % len(workbooks)], rounds, timeout, i),
+                                     range(sessions)))
+    elapsed = time.perf_counter() - started
+    stop.set()
+    sampler.join()
+    rss_end = rss_bytes()
+
+    latencies = {}
+    for name in INTERACTIONS:
+        samples = np.array([s for timings, _ in outcomes for s in timings[name]])
+        p50, p95, p99 = np.percentile(samples, [50, 95, 99]) * 1000
+        latencies[name] = {"count": int(samples.size), "p50_ms": p50, "p95_ms": p95, "p99_ms": p99,
+                           "max_ms": samples.max() * 1000}
+    interactions = sum(v["count"] for v in latencies.values())
+    errors = [e for _, session_errors in outcomes for e in session_errors]
+    result = {
+        "sessions": sessions,
+        "rounds": rounds,
+        "seconds": elapsed,
+        "interactions_per_sec": interactions / elapsed,
+        "sessions_per_sec": sessions / elapsed,
+        "rss_start_mib": rss_start / 2 ** 20,
+        "rss_end_mib": rss_end / 2 ** 20,
+        "rss_peak_mib": peak[0] / 2 ** 20,
+        "rss_growth_per_session_kib": (rss_end - rss_start) / sessions / 1024,
+        "latency": latencies,
+        "errors": errors[:20],
+    }
+    calc = latencies["calculate_dcf"]
+    print(f"{sessions:>4} sessions  {result['interactions_per_sec']:8.1f} interactions/s  "
+          f"calculate p50 {calc['p50_ms']:8.1f} ms  p95 {calc['p95_ms']:8.1f} ms  "
+          f"RSS {result['rss_end_mib']:7.1f} MiB (+{result['rss_growth_per_session_kib']:,.0f} KiB/session)"
+          + (f"  {len(errors)} errors" if errors else ""), file=log)
+    return result
+
+
+def run(levels, rounds=3, distinct_workbooks=8, years=10, timeout=120, log=sys.stderr):
+    _patch_file_uploader()
+    workbooks = [data_sheet_bytes(company_name=f"Load Test {i}", years=years, seed=i) for i in range(distinct_workbooks)]
+    # One warm-up session so imports and first-run costs don't land on the first level
+    run_session(workbooks[0], 1, timeout, -1)
+    results = [run_level(sessions, rounds, workbooks, timeout, log) for sessions in levels]
+    best = max(results, key=lambda r: r["interactions_per_sec"])
+    return {
+        "meta": {
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "python": platform.python_version(),
+            "streamlit": st.__version__,
+            "cpus": os.cpu_count(),
+        },
+        "results": results,
+        # Past this many sessions throughput stops improving and latency only grows
+        "saturation_sessions": best["sessions"],
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Load-test app.py with concurrent headless sessions.")
+    parser.add_argument("-o", "--output", default="load_test_results.json", help="Where to write the JSON results")
+    parser.add_argument("--sessions", nargs="+", type=int, default=[1, 2, 4, 8], help="Concurrency levels to run")
+    parser.add_argument("--rounds", type=int, default=3, help="Import → tweak → calculate cycles per session")
+    parser.add_argument("--workbooks", type=int, default=8, help="Distinct synthetic workbooks shared across sessions")
+    parser.add_argument("--years", type=int, default=10, help="Reported years in each synthetic workbook")
+    parser.add_argument("--timeout", type=float, default=120, help="Seconds allowed for one script run")
+    args = parser.parse_args(argv)
+
+    # Keep the load test out of the real result cache
+    os.environ.setdefault("DCF_RESULT_CACHE", os.path.join(tempfile.mkdtemp(prefix="dcf-load-test-"), "results.sqlite"))
+    results = run(args.sessions, args.rounds, args.workbooks, args.years, args.timeout)
+    print(f"Throughput peaked at {results['saturation_sessions']} concurrent sessions", file=sys.stderr)
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(results, f, indent=2)
+    return 1 if any(r["errors"] for r in results["results"]) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
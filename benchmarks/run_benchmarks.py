@@ -0,0 +1,170 @@
+# Times the parse, compute and render hot paths on synthetic workbooks and writes JSON results.
+#
+#   python -m benchmarks.run_benchmarks -o bench.json
+#   python -m benchmarks.run_benchmarks -o new.json --baseline bench.json --threshold 1.25
+#
+# With --baseline the run exits non-zero if any stage's median time regresses past the threshold.
+import argparse
+import io
+import json
+import platform
+import statistics
+import sys
+import time
+import tracemalloc
+import warnings
+
+import numpy as np
+import openpyxl
+import pandas as pd
+
+from benchmarks.synthetic_workbook import data_sheet_bytes
+from calculations import calculate_dcf, dcf_fair_value, dcf_fair_value_batch
+from file_loader import extract_tables, format_column_headers, read_data_sheet
+
+SIZES = {
+    "small": {"years": 10, "extra_rows": 0, "extra_sections": 0, "grid": 4},
+    "medium": {"years": 12, "extra_rows": 100, "extra_sections": 10, "grid": 50},
+    "large": {"years": 15, "extra_rows": 500, "extra_sections": 50, "grid": 200},
+}
+
+ASSUMPTIONS = dict(forecast_years=10, ebit_margin=18.0, depreciation_pct=4.0, capex_pct=3.0, wc_change_pct=2.0,
+                   tax_rate=25.0, shares=12.5)
+
+
+def _load_workbook(data):
+    wb = openpyxl.load_workbook(io.BytesIO(data), data_only=True)
+    return pd.DataFrame(list(wb["Data Sheet"].values))
+
+
+def _styled_html(grid):
+    base_value = float(np.median(grid.to_numpy()))
+
+    def style_fair(val):
+        diff_pct = ((val - base_value) / base_value) * 100
+        if diff_pct > 10:
+            return 'background-color:#e6ffed'
+        elif diff_pct < -10:
+            return 'background-color:#ffe6e6'
+        return 'background-color:#f0f0f0'
+
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore", FutureWarning)
+        return grid.style.applymap(style_fair).format("₹{:.2f}").to_html()
+
+
+def build_stages(size):
+    spec = SIZES[size]
+    data = data_sheet_bytes(years=spec["years"], extra_rows=spec["extra_rows"],
+                            extra_sections=spec["extra_sections"], seed=1)
+    df_all = read_data_sheet(data)
+    headers = [df_all.iloc[i, 0:11].tolist() for i in range(min(len(df_all), 200))]
+    base_revenue = 1000.0
+    n = spec["grid"]
+    waccs = np.linspace(7, 13, n)
+    terminal_gs = np.linspace(2, 6, n)
+    scalar_cells = min(n, 50)
+    grid, _ = dcf_fair_value_batch(base_revenue, interest_pct=waccs[:, None], terminal_growth=terminal_gs[None, :],
+                                   growth_1_5=10, growth_6=10, **ASSUMPTIONS)
+    df_grid = pd.DataFrame(grid, index=[f"WACC = {w:.2f}%" for w in waccs],
+                           columns=[f"Terminal Growth = {g:.2f}%" for g in terminal_gs])
+
+    return {
+        "load_workbook": lambda: _load_workbook(data),
+        "read_data_sheet": lambda: read_data_sheet(data),
+        "extract_tables": lambda: extract_tables(df_all),
+        "format_column_headers": lambda: [format_column_headers(h) for h in headers],
+        "calculate_dcf": lambda: calculate_dcf(base_revenue, 15, 18.0, 4.0, 3.0, 10.0, 2.0, 25.0, 12.5, 12.0, 10.0, 4.0),
+        "sensitivity_scalar": lambda: [dcf_fair_value(base_revenue, interest_pct=w, terminal_growth=g, growth_1_5=10,
+                                                      growth_6=10, **ASSUMPTIONS)
+                                       for w in waccs[:scalar_cells] for g in terminal_gs[:scalar_cells]],
+        "sensitivity_grid": lambda: dcf_fair_value_batch(base_revenue, interest_pct=waccs[:, None],
+                                                         terminal_growth=terminal_gs[None, :], growth_1_5=10,
+                                                         growth_6=10, **ASSUMPTIONS),
+        "styler_render": lambda: _styled_html(df_grid),
+    }
+
+
+def time_stage(fn, repeats, min_seconds=0.2):
+    fn()  # warm-up
+    timings = []
+    started = time.perf_counter()
+    while len(timings) < repeats or (time.perf_counter() - started < min_seconds and len(timings) < 1000):
+        t0 = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - t0)
+
+    tracemalloc.start()
+    fn()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {
+        "median_s": statistics.median(timings),
+        "min_s": min(timings),
+        "repeats": len(timings),
+        "peak_kib": peak / 1024,
+    }
+
+
+def run(sizes, stages=None, repeats=5, log=sys.stderr):
+    results = []
+    for size in sizes:
+        for stage, fn in build_stages(size).items():
+            if stages and stage not in stages:
+                continue
+            result = {"stage": stage, "size": size, **time_stage(fn, repeats)}
+            results.append(result)
+            print(f"{size:>7} {stage:<22} {result['median_s'] * 1000:10.3f} ms  peak {result['peak_kib']:10.1f} KiB",
+                  file=log)
+    return {
+        "meta": {
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "python": platform.python_version(),
+            "numpy": np.__version__,
+            "pandas": pd.__version__,
+            "openpyxl": openpyxl.__version__,
+        },
+        "results": results,
+    }
+
+
+def compare(current, baseline, threshold):
+    previous = {(r["stage"], r["size"]): r for r in baseline["results"]}
+    regressions = []
+    for result in current["results"]:
+        before = previous.get((result["stage"], result["size"]))
+        if before and result["median_s"] > before["median_s"] * threshold:
+            regressions.append({"stage": result["stage"], "size": result["size"],
+                                "baseline_s": before["median_s"], "current_s": result["median_s"],
+                                "ratio": result["median_s"] / before["median_s"]})
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark workbook parsing, DCF maths and Styler rendering.")
+    parser.add_argument("-o", "--output", default="bench_results.json", help="Where to write the JSON results")
+    parser.add_argument("--sizes", nargs="+", default=list(SIZES), choices=list(SIZES))
+    parser.add_argument("--stages", nargs="+", default=None, help="Only run these stages")
+    parser.add_argument("--repeats", type=int, default=5, help="Minimum timed runs per stage")
+    parser.add_argument("--baseline", help="Previous JSON results to compare against")
+    parser.add_argument("--threshold", type=float, default=1.25, help="Allowed slowdown ratio before failing")
+    args = parser.parse_args(argv)
+
+    current = run(args.sizes, args.stages, args.repeats)
+    status = 0
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            baseline = json.load(f)
+        current["regressions"] = compare(current, baseline, args.threshold)
+        for r in current["regressions"]:
+            print(f"REGRESSION {r['size']} {r['stage']}: {r['baseline_s'] * 1000:.3f} ms → "
+                  f"{r['current_s'] * 1000:.3f} ms ({r['ratio']:.2f}x)", file=sys.stderr)
+        status = 1 if current["regressions"] else 0
+
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(current, f, indent=2)
+    return status
+
+
+if __name__ == "__main__":
+    sys.exit(main())
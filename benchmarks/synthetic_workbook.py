@@ -0,0 +1,98 @@
+# Generator for realistic Screener-style "Data Sheet" workbooks of configurable size, used by the
+# benchmark and load-test scripts.
+import datetime
+import io
+import random
+
+import openpyxl
+
+PL_ITEMS = [
+    ("Raw Material Cost", 0.42), ("Change in Inventory", 0.01), ("Power and Fuel", 0.04),
+    ("Other Mfr. Exp", 0.05), ("Employee Cost", 0.10), ("Selling and admin", 0.07),
+    ("Other Expenses", 0.03), ("Other Income", 0.02), ("Depreciation", 0.04), ("Interest", 0.01),
+    ("Profit before tax", 0.17), ("Tax", 0.045), ("Net profit", 0.125), ("Dividend Amount", 0.03),
+]
+BALANCE_SHEET_ITEMS = [
+    ("Equity Share Capital", None), ("Reserves", 0.6), ("Borrowings", 0.2), ("Other Liabilities", 0.25),
+    ("Total", 1.2), ("Net Block", 0.5), ("Capital Work in Progress", 0.05), ("Investments", 0.15),
+    ("Other Assets", 0.5), ("Receivables", 0.15), ("Inventory", 0.12), ("Cash & Bank", 0.08),
+]
+CASH_FLOW_ITEMS = [
+    ("Cash from Operating Activity", 0.14), ("Cash from Investing Activity", -0.08),
+    ("Cash from Financing Activity", -0.04), ("Net Cash Flow", 0.02),
+]
+
+
+def _year_ends(years, last_year=2024):
+    return [datetime.datetime(last_year - years + 1 + i, 3, 31) for i in range(years)]
+
+
+def _section(ws, label, dates, rows):
+    ws.append([label])
+    ws.append(["Report Date"] + dates)
+    for row in rows:
+        ws.append(row)
+    ws.append([])
+
+
+# Writes one workbook. years adds columns, extra_rows adds line items to every statement and
+# extra_sections appends further statement-shaped blocks after the standard ones.
+def write_data_sheet(target, company_name="Synthetic Ltd", years=10, extra_rows=0, extra_sections=0, seed=0):
+    rng = random.Random(seed)
+    wb = openpyxl.Workbook(write_only=True)
+    ws = wb.create_sheet("Data Sheet")
+
+    growth = rng.uniform(0.03, 0.2)
+    base = rng.uniform(200, 50000)
+    sales = [base * (1 + growth) ** i * rng.uniform(0.95, 1.05) for i in range(years)]
+    shares = rng.choice([5, 12.5, 40, 150, 600]) * 10000000
+    price = sales[-1] * rng.uniform(0.5, 6) / (shares / 10000000)
+    noise = lambda: rng.uniform(0.9, 1.1)
+
+    ws.append(["COMPANY NAME", company_name])
+    ws.append([])
+    ws.append(["META", None])
+    ws.append(["Number of shares", shares / 10000000])
+    ws.append(["Face Value", 10])
+    ws.append(["Current Price", round(price, 2)])
+    ws.append(["Market Capitalization", round(price * shares / 10000000, 2)])
+    ws.append([])
+
+    dates = _year_ends(years)
+    extras = [[f"Extra Item {i + 1}"] + [s * rng.uniform(0, 0.02) for s in sales] for i in range(extra_rows)]
+    _section(ws, "PROFIT & LOSS", dates,
+             [["Sales"] + sales] + [[item] + [s * share * noise() for s in sales] for item, share in PL_ITEMS] + extras)
+
+    quarters = max(10, years)
+    quarter_dates = [datetime.datetime(2024, 3, 31) - datetime.timedelta(days=91 * (quarters - 1 - i)) for i in range(quarters)]
+    quarter_sales = [sales[-1] / 4 * (1 + growth) ** (i / 4 - quarters / 4) for i in range(quarters)]
+    _section(ws, "Quarters", quarter_dates,
+             [["Sales"] + quarter_sales] + [[item] + [s * share * noise() for s in quarter_sales]
+                                             for item, share in PL_ITEMS[:8]] + extras)
+
+    _section(ws, "BALANCE SHEET", dates,
+             [[item] + [shares / 10000000 * 10 if share is None else s * share * noise() for s in sales]
+              for item, share in BALANCE_SHEET_ITEMS]
+             + [["No. of Equity Shares"] + [shares] * years, ["Face value"] + [10] * years] + extras)
+
+    _section(ws, "CASH FLOW:", dates,
+             [[item] + [s * share * noise() for s in sales] for item, share in CASH_FLOW_ITEMS] + extras)
+
+    ws.append(["PRICE:"] + [price * (sales[i] / sales[-1]) * noise() for i in range(years)])
+    ws.append([])
+    ws.append(["DERIVED:"])
+    ws.append(["Adjusted Equity Shares in Cr"] + [shares / 10000000] * years)
+    ws.append([])
+
+    for n in range(extra_sections):
+        _section(ws, f"EXTRA SECTION {n + 1}", dates,
+                 [[f"Extra Line {n + 1}.{i + 1}"] + [s * rng.uniform(0, 0.1) for s in sales]
+                  for i in range(20 + extra_rows)])
+
+    wb.save(target)
+
+
+def data_sheet_bytes(**kwargs):
+    buffer = io.BytesIO()
+    write_data_sheet(buffer, **kwargs)
+    return buffer.getvalue()
@@ -0,0 +1,68 @@
+import threading
+import time
+from collections import OrderedDict
+
+
+# Thread-safe LRU cache with an optional time-to-live. One instance at module level is shared by
+# every Streamlit session in the process. With max_bytes, weigh(value) gives each entry's size and
+# least recently used entries are evicted until the total fits; a value larger than the whole
+# budget is returned to the caller but not kept.
+class LRUCache:
+    def __init__(self, max_entries=32, ttl=None, max_bytes=None, weigh=None):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.weigh = weigh
+        self.hits = 0
+        self.misses = 0
+        self.nbytes = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, default=None):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                stored_at, value, _ = entry
+                if self.ttl is None or time.monotonic() - stored_at < self.ttl:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return value
+                self._remove(key)
+            self.misses += 1
+            return default
+
+    def put(self, key, value):
+        size = self.weigh(value) if self.weigh is not None else 0
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            if self.max_bytes is not None and size > self.max_bytes:
+                return
+            self._entries[key] = (time.monotonic(), value, size)
+            self.nbytes += size
+            while len(self._entries) > self.max_entries or (self.max_bytes is not None and self.nbytes > self.max_bytes):
+                self._remove(next(iter(self._entries)))
+
+    def _remove(self, key):
+        _, _, size = self._entries.pop(key)
+        self.nbytes -= size
+
+    def get_or_compute(self, key, compute):
+        sentinel = object()
+        value = self.get(key, sentinel)
+        if value is sentinel:
+            value = compute()
+            self.put(key, value)
+        return value
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.nbytes = 0
+
+    def stats(self):
+        with self._lock:
+            return {"hits": self.hits, "misses": self.misses, "entries": len(self._entries),
+                    "max_entries": self.max_entries, "bytes": self.nbytes, "max_bytes": self.max_bytes,
+                    "ttl": self.ttl}
@@ -1 +1,271 @@
+import numpy as np
+import pandas as pd
 
+# Bump whenever the DCF maths or the sensitivity grids built on it change; persisted results
+# written under another version are discarded
+MODEL_VERSION = "1"
+
+FCF_COLUMNS = ["Year", "Revenue", "EBIT", "Tax", "Net Operating PAT", "Depreciation", "CapEx",
+               "Change in WC", "Free Cash Flow", "PV of FCF"]
+
+
+# Terminal value (Gordon growth) on scalars or broadcastable arrays
+def terminal_value_batch(fcf, g, r, n):
+    fcf, g, r, n = (np.asarray(x, dtype=float) for x in (fcf, g, r, n))
+    with np.errstate(divide="ignore", invalid="ignore"):
+        tv = (fcf * (1 + g / 100)) / ((r / 100) - (g / 100))
+        return tv / ((1 + r / 100) ** n), tv
+
+
+# Year-by-year DCF on broadcast arrays; only needed when the per-year table is displayed
+def _dcf_year_loop(revenue, years, ebit_margin, depreciation_pct, capex_pct, wc_change_pct, tax_rate,
+                   interest_pct, growth_rate_1_2, growth_rate_3_4_5, growth_rate_6, table=False):
+    shape = revenue.shape
+    max_years = int(years.max()) if years.size else 0
+    total_pv_fcf = np.zeros(shape)
+    final_fcf = np.zeros(shape)
+    columns = None
+    if table:
+        columns = {name: np.zeros(shape + (max_years + 1,)) for name in FCF_COLUMNS[1:]}
+        ebit = revenue * (ebit_margin / 100)
+        tax = ebit * (tax_rate / 100)
+        columns["Revenue"][..., 0] = revenue
+        columns["EBIT"][..., 0] = ebit
+        columns["Tax"][..., 0] = tax
+        columns["Net Operating PAT"][..., 0] = ebit - tax
+        columns["Depreciation"][..., 0] = revenue * (depreciation_pct / 100)
+
+    for year in range(1, max_years + 1):
+        if year <= 2:
+            growth = growth_rate_1_2
+        elif year <= 5:
+            growth = growth_rate_3_4_5
+        else:
+            growth = growth_rate_6
+        active = year <= years
+        revenue = np.where(active, revenue * (1 + growth / 100), revenue)
+
+        ebit = revenue * (ebit_margin / 100)
+        depreciation = revenue * (depreciation_pct / 100)
+        tax = ebit * (tax_rate / 100)
+        net_op_pat = ebit - tax
+        capex = revenue * (capex_pct / 100)
+        wc_change = revenue * wc_change_pct / 100
+        fcf = net_op_pat + depreciation - capex - wc_change
+        pv_fcf = fcf / ((1 + interest_pct / 100) ** year)
+
+        total_pv_fcf = np.where(active, total_pv_fcf + pv_fcf, total_pv_fcf)
+        final_fcf = np.where(year == years, fcf, final_fcf)
+        if table:
+            for name, value in zip(FCF_COLUMNS[1:], (revenue, ebit, tax, net_op_pat, depreciation,
+                                                     capex, wc_change, fcf, pv_fcf)):
+                columns[name][..., year] = value
+    return total_pv_fcf, final_fcf, columns
+
+
+# Sum of q**j for j = 1..n. expm1/log1p keep it accurate when q is close to 1 (growth close to
+# WACC) and q == 1 falls back to n exactly.
+def _geometric_sum(q, n):
+    d = q - 1
+    with np.errstate(divide="ignore", invalid="ignore", over="ignore"):
+        smooth = q * np.expm1(n * np.log1p(np.where(q > 0, d, 0.0))) / d
+        direct = q * (q ** n - 1) / d
+    total = np.where(q > 0, smooth, direct)
+    total = np.where(d == 0, n, total)
+    return np.where(n == 0, 0.0, total)
+
+
+# Closed-form DCF: revenue grows geometrically within each phase (years 1-2, 3-5, 6+) and FCF is a
+# fixed share of revenue, so the PV of each phase is a geometric series. Cost is O(phases).
+def _dcf_closed_form(revenue, years, ebit_margin, depreciation_pct, capex_pct, wc_change_pct, tax_rate,
+                     interest_pct, growth_rate_1_2, growth_rate_3_4_5, growth_rate_6):
+    fcf_margin = ((ebit_margin / 100) * (1 - tax_rate / 100) + depreciation_pct / 100
+                  - capex_pct / 100 - wc_change_pct / 100)
+    rate = 1 + interest_pct / 100
+    phases = [
+        (growth_rate_1_2, np.clip(years, 0, 2)),
+        (growth_rate_3_4_5, np.clip(years - 2, 0, 3)),
+        (growth_rate_6, np.maximum(years - 5, 0)),
+    ]
+    discount = np.ones(revenue.shape)
+    total_pv_fcf = np.zeros(revenue.shape)
+    for growth, length in phases:
+        factor = 1 + growth / 100
+        total_pv_fcf = total_pv_fcf + fcf_margin * revenue / discount * _geometric_sum(factor / rate, length)
+        revenue = revenue * factor ** length
+        discount = discount * rate ** length
+    final_fcf = np.where(years > 0, fcf_margin * revenue, 0.0)
+    return total_pv_fcf, final_fcf
+
+
+# Vectorized DCF engine: every assumption may be a scalar or an array and all inputs are broadcast
+# together. Valuations use the closed form; table=True runs the year loop to fill the FCF table.
+def dcf_batch(base_revenue, forecast_years, ebit_margin, depreciation_pct, capex_pct, wc_change_pct,
+              tax_rate, interest_pct, growth_rate_1_2, growth_rate_3_4_5, growth_rate_6,
+              terminal_growth, shares, table=False):
+    (base_revenue, ebit_margin, depreciation_pct, capex_pct, wc_change_pct, tax_rate, interest_pct,
+     growth_rate_1_2, growth_rate_3_4_5, growth_rate_6, terminal_growth, shares) = np.broadcast_arrays(
+        *(np.asarray(x, dtype=float) for x in (
+            base_revenue, ebit_margin, depreciation_pct, capex_pct, wc_change_pct, tax_rate, interest_pct,
+            growth_rate_1_2, growth_rate_3_4_5, growth_rate_6, terminal_growth, shares)))
+    shape = np.broadcast_shapes(base_revenue.shape, np.shape(forecast_years))
+    years = np.broadcast_to(np.asarray(forecast_years, dtype=int), shape)
+    revenue = np.broadcast_to(base_revenue, shape).astype(float)
+    args = (revenue, years, ebit_margin, depreciation_pct, capex_pct, wc_change_pct, tax_rate, interest_pct,
+            growth_rate_1_2, growth_rate_3_4_5, growth_rate_6)
+
+    if table:
+        total_pv_fcf, final_fcf, columns = _dcf_year_loop(*args, table=True)
+    else:
+        total_pv_fcf, final_fcf = _dcf_closed_form(*args)
+
+    pv_terminal, terminal_value = terminal_value_batch(final_fcf, terminal_growth, interest_pct, years)
+    enterprise_value = total_pv_fcf + pv_terminal
+    with np.errstate(divide="ignore", invalid="ignore"):
+        fair_value = np.where(shares != 0, enterprise_value / shares, 0.0)
+        terminal_weight = np.where(enterprise_value != 0, pv_terminal / enterprise_value * 100, 0.0)
+
+    result = {
+        "fair_value": fair_value,
+        "terminal_weight": terminal_weight,
+        "enterprise_value": enterprise_value,
+        "total_pv_fcf": total_pv_fcf,
+        "pv_terminal": pv_terminal,
+        "terminal_value": terminal_value,
+        "final_fcf": final_fcf,
+    }
+    if table:
+        result["table"] = columns
+    return result
+
+
+# Modularized DCF Calculation
+def calculate_dcf(base_revenue, forecast_years, ebit_margin, depreciation_pct, capex_pct,
+                  interest_pct, wc_change_pct, tax_rate, shares, growth_rate_1_2,
+                  growth_rate_3_4_5, growth_rate_6):
+    result = dcf_batch(base_revenue, forecast_years, ebit_margin, depreciation_pct, capex_pct, wc_change_pct,
+                       tax_rate, interest_pct, growth_rate_1_2, growth_rate_3_4_5, growth_rate_6,
+                       growth_rate_6, shares, table=True)
+    columns = result["table"]
+    fcf_data = []
+    for year in range(forecast_years + 1):
+        fcf_data.append([f"Year {year}"] + [float(columns[name][year]) for name in FCF_COLUMNS[1:]])
+    return fcf_data
+
+
+def calculate_terminal_value(fcf, g, r, n):
+    pv_terminal, tv = terminal_value_batch(fcf, g, r, n)
+    return float(pv_terminal), float(tv)
+
+
+# Array form of dcf_fair_value: growth_1_5 is applied to every forecast year, growth_6 is only
+# kept so the signature matches the scalar version.
+def dcf_fair_value_batch(base_revenue, forecast_years, ebit_margin, depreciation_pct, capex_pct, wc_change_pct,
+                         tax_rate, interest_pct, shares, growth_1_5, growth_6, terminal_growth):
+    result = dcf_batch(base_revenue, forecast_years, ebit_margin, depreciation_pct, capex_pct, wc_change_pct,
+                       tax_rate, interest_pct, growth_1_5, growth_1_5, growth_1_5, terminal_growth, shares)
+    return result["fair_value"], result["terminal_weight"]
+
+
+def dcf_fair_value(base_revenue, forecast_years, ebit_margin, depreciation_pct, capex_pct, wc_change_pct,
+    tax_rate, interest_pct, shares, growth_1_5, growth_6, terminal_growth):
+    result = dcf_batch(base_revenue, forecast_years, ebit_margin, depreciation_pct, capex_pct, wc_change_pct,
+                       tax_rate, interest_pct, growth_1_5, growth_1_5, growth_1_5, terminal_growth, shares)
+    return float(result["fair_value"]), float(result["terminal_weight"])
+
+
+# Defaults for the judgement-based inputs on the Inputs tab (keys match st.session_state)
+DEFAULT_ASSUMPTIONS = {
+    "user_growth_rate_yr_1_2": 10.0,
+    "user_growth_rate_yr_3_4_5": 10.0,
+    "user_growth_rate_yr_6_onwards": 4.0,
+    "forecast_years": 5,
+    "interest_pct": 10.0,
+    "wc_change_pct": 2.0,
+    "capex_pct": 2.0,
+}
+
+EXPENSE_ROWS = ["Raw Material Cost", "Change in Inventory", "Power and Fuel",
+                "Other Mfr. Exp", "Employee Cost", "Selling and admin", "Other Expenses"]
+
+
+# Data-driven inputs derived from the latest reported year, as shown on the Inputs tab
+# (both statements indexed by line item)
+def derive_assumptions(annual_pl, balance_sheet):
+    share_outstanding_row = balance_sheet.loc["No. of Equity Shares"].dropna()
+
+    df = annual_pl
+    revenue_row = df.loc["Sales"].dropna()
+    tax_row = df.loc["Tax"].dropna()
+    depreciation_row = df.loc["Depreciation"].dropna()
+    try:
+        calculated_ebit = revenue_row.iloc[-1] - sum(df.loc[row].dropna().iloc[-1] for row in EXPENSE_ROWS
+                                                     if row in df.index)
+        latest_revenue = revenue_row.iloc[-1]
+        calculated_ebit_margin = round((calculated_ebit / latest_revenue) * 100, 1)
+        calculated_tax_rate = round((tax_row.iloc[-1] / calculated_ebit) * 100, 1)
+        calculated_depreciation_rate = round((depreciation_row.iloc[-1] / latest_revenue) * 100, 1)
+    except Exception:
+        calculated_ebit = 0
+        calculated_ebit_margin = 0
+        calculated_tax_rate = 0
+        calculated_depreciation_rate = 0
+
+    try:
+        outstanding_shares = round(share_outstanding_row.iloc[-1] / 10000000, 2)
+    except Exception:
+        outstanding_shares = 0
+
+    return {
+        "base_revenue": revenue_row.values[-1],
+        "ebit": calculated_ebit,
+        "ebit_margin": calculated_ebit_margin,
+        "tax_rate": calculated_tax_rate,
+        "depreciation_pct": calculated_depreciation_rate,
+        "shares_outstanding": outstanding_shares,
+    }
+
+
+# derive_assumptions for every reported year at once: one row per annual column, with the same
+# rounding as the Inputs tab. Years where a ratio cannot be formed (no sales, zero EBIT) are NaN.
+def derive_assumptions_history(annual_pl, balance_sheet):
+    columns = annual_pl.columns
+    sales = annual_pl.loc["Sales"].to_numpy(dtype=float)
+    expenses = annual_pl.loc[[row for row in EXPENSE_ROWS if row in annual_pl.index]].to_numpy(dtype=float)
+    ebit = sales - expenses.sum(axis=0)
+
+    def row(frame, label):
+        if label not in frame.index:
+            return np.full(len(columns), np.nan)
+        return frame.loc[label].reindex(columns).to_numpy(dtype=float)
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        history = {
+            "base_revenue": sales,
+            "ebit": ebit,
+            "ebit_margin": np.round(ebit / sales * 100, 1),
+            "tax_rate": np.round(row(annual_pl, "Tax") / ebit * 100, 1),
+            "depreciation_pct": np.round(row(annual_pl, "Depreciation") / sales * 100, 1),
+            "shares_outstanding": np.round(row(balance_sheet, "No. of Equity Shares") / 10000000, 2),
+        }
+    history = {key: np.where(np.isfinite(value), value, np.nan) for key, value in history.items()}
+    return pd.DataFrame(history, index=columns)
+
+
+# Full DCF from a dict of Inputs-tab assumptions; years 6+ grow at the terminal rate as in the DCF tab
+def value_assumptions(base_revenue, assumptions):
+    terminal_growth = assumptions["user_growth_rate_yr_6_onwards"]
+    return dcf_batch(base_revenue, assumptions["forecast_years"], assumptions["ebit_margin"],
+                     assumptions["depreciation_pct"], assumptions["capex_pct"], assumptions["wc_change_pct"],
+                     assumptions["tax_rate"], assumptions["interest_pct"], assumptions["user_growth_rate_yr_1_2"],
+                     assumptions["user_growth_rate_yr_3_4_5"], terminal_growth, terminal_growth,
+                     assumptions["shares_outstanding"])
+
+
+def valuation_verdict(fair_value, current_price):
+    diff_pct = ((fair_value - current_price) / current_price) * 100
+    if diff_pct > 10:
+        return "Undervalued", diff_pct
+    elif diff_pct < -10:
+        return "Overvalued", diff_pct
+    return "Fairly Valued", diff_pct
@@ -0,0 +1,79 @@
+import inspect
+import threading
+
+from diagnostics import span
+
+_SCALARS = (bool, int, float, complex, str, bytes, type(None))
+
+
+def _same(a, b):
+    if a is b:
+        return True
+    if isinstance(a, _SCALARS) or isinstance(b, _SCALARS) or isinstance(a, tuple):
+        try:
+            return type(a) is type(b) and bool(a == b)
+        except Exception:
+            return False
+    # numpy scalars compare by value, anything else (DataFrames, arrays) only by identity
+    if getattr(a, "shape", None) == () and getattr(b, "shape", None) == ():
+        return bool(a == b)
+    return False
+
+
+# Small dependency graph for reruns: each node declares its inputs (source values or other nodes)
+# through its parameter names and is memoized on them, so evaluate() only recomputes nodes whose
+# inputs actually changed since the previous run.
+class ComputeGraph:
+    def __init__(self):
+        self._nodes = {}
+        self._memo = {}
+        self._lock = threading.RLock()
+        self.recomputed = []
+
+    def node(self, fn, name=None):
+        self._nodes[name or fn.__name__] = (fn, tuple(inspect.signature(fn).parameters))
+        return fn
+
+    def inputs(self, name):
+        return self._nodes[name][1]
+
+    def _resolve(self, name, sources, results):
+        if name in results:
+            return results[name]
+        if name not in self._nodes:
+            results[name] = sources[name]
+            return results[name]
+
+        fn, inputs = self._nodes[name]
+        values = tuple(self._resolve(dep, sources, results) for dep in inputs)
+        memo = self._memo.get(name)
+        if memo is not None and len(memo[0]) == len(values) and all(map(_same, memo[0], values)):
+            result = memo[1]
+        else:
+            with span(f"graph.{name}"):
+                result = fn(*values)
+            # Keep the input objects alive so identity checks can never match a recycled id()
+            self._memo[name] = (values, result)
+            self.recomputed.append(name)
+        results[name] = result
+        return result
+
+    # on_result(name, value) is called as each requested node is ready; an exception raised from it
+    # stops the evaluation, keeping the nodes finished so far memoized
+    def evaluate(self, names, sources, on_result=None):
+        with self._lock:
+            self.recomputed = []
+            results = {}
+            evaluated = {}
+            for name in names:
+                evaluated[name] = self._resolve(name, sources, results)
+                if on_result is not None:
+                    on_result(name, evaluated[name])
+            return evaluated
+
+    def clear(self):
+        self._memo.clear()
+
+    @property
+    def nodes(self):
+        return list(self._nodes)
@@ -0,0 +1,118 @@
+import numpy as np
+import pandas as pd
+
+from calculations import FCF_COLUMNS, calculate_dcf, dcf_batch, dcf_fair_value, dcf_fair_value_batch
+from compute_graph import ComputeGraph
+from diagnostics import span
+from statement_store import meta_value
+
+# Inputs of the DCF tab, read from st.session_state on every rerun
+DCF_SOURCES = [
+    "annual_pl", "meta", "forecast_years", "ebit_margin", "depreciation_pct", "capex_pct", "wc_change_pct",
+    "tax_rate", "interest_pct", "shares_outstanding", "user_growth_rate_yr_1_2", "user_growth_rate_yr_3_4_5",
+    "user_growth_rate_yr_6_onwards",
+]
+# The assumption part of DCF_SOURCES; the statements are identified by the workbook hash instead
+DCF_ASSUMPTION_KEYS = [key for key in DCF_SOURCES if key not in ("annual_pl", "meta")]
+
+GROWTH_SCENARIOS = [5, 10, 14, 16, 25]
+SCENARIO_WACCS = [7, 9, 11, 13]
+SCENARIO_TERMINAL_GROWTHS = [4, 7, 10, 12]
+SCENARIO_EBIT_MARGINS = [8, 12, 16, 20, 25]
+# Scenarios 2 and 3 (and the colour baseline) hold 5-year growth at this rate
+SCENARIO_BASE_GROWTH = 10
+
+
+def base_revenue(annual_pl):
+    return annual_pl.loc["Sales"].dropna().values[-1]
+
+
+def current_price(meta):
+    try:
+        return meta_value(meta, "Current Price")
+    except Exception:
+        return None
+
+
+def fcf_table(base_revenue, forecast_years, ebit_margin, depreciation_pct, capex_pct, interest_pct, wc_change_pct,
+              tax_rate, user_growth_rate_yr_1_2, user_growth_rate_yr_3_4_5, user_growth_rate_yr_6_onwards):
+    fcf_data = calculate_dcf(base_revenue, forecast_years, ebit_margin, depreciation_pct, capex_pct, interest_pct,
+                             wc_change_pct, tax_rate, None, user_growth_rate_yr_1_2, user_growth_rate_yr_3_4_5,
+                             user_growth_rate_yr_6_onwards)
+    return pd.DataFrame(fcf_data, columns=FCF_COLUMNS)
+
+
+def valuation(base_revenue, forecast_years, ebit_margin, depreciation_pct, capex_pct, wc_change_pct, tax_rate,
+              interest_pct, shares_outstanding, user_growth_rate_yr_1_2, user_growth_rate_yr_3_4_5,
+              user_growth_rate_yr_6_onwards):
+    result = dcf_batch(base_revenue, forecast_years, ebit_margin, depreciation_pct, capex_pct, wc_change_pct,
+                       tax_rate, interest_pct, user_growth_rate_yr_1_2, user_growth_rate_yr_3_4_5,
+                       user_growth_rate_yr_6_onwards, user_growth_rate_yr_6_onwards, shares_outstanding)
+    return {key: float(value) for key, value in result.items()}
+
+
+# Fair value every sensitivity cell is coloured against
+def base_value(base_revenue, forecast_years, ebit_margin, depreciation_pct, capex_pct, wc_change_pct, tax_rate,
+               interest_pct, shares_outstanding, user_growth_rate_yr_6_onwards):
+    value, _ = dcf_fair_value(base_revenue, forecast_years, ebit_margin, depreciation_pct, capex_pct, wc_change_pct,
+                              tax_rate, interest_pct, shares_outstanding, SCENARIO_BASE_GROWTH, SCENARIO_BASE_GROWTH,
+                              user_growth_rate_yr_6_onwards)
+    return value
+
+
+def growth_sensitivity(base_revenue, forecast_years, ebit_margin, depreciation_pct, capex_pct, wc_change_pct,
+                       tax_rate, interest_pct, shares_outstanding, user_growth_rate_yr_6_onwards):
+    growth_grid = np.array(GROWTH_SCENARIOS)
+    values, tv_pcts = dcf_fair_value_batch(base_revenue, forecast_years, ebit_margin, depreciation_pct, capex_pct,
+                                           wc_change_pct, tax_rate, interest_pct, shares_outstanding,
+                                           growth_grid, growth_grid, user_growth_rate_yr_6_onwards)
+    return pd.DataFrame({"5Y Growth Rate": [f"{g}%" for g in GROWTH_SCENARIOS], "Fair Value (₹)": values,
+                         "Terminal % of EV": [f"{tv_pct:.1f}%" for tv_pct in tv_pcts]})
+
+
+def wacc_terminal_sensitivity(base_revenue, forecast_years, ebit_margin, depreciation_pct, capex_pct, wc_change_pct,
+                              tax_rate, shares_outstanding):
+    matrix, _ = dcf_fair_value_batch(base_revenue, forecast_years, ebit_margin, depreciation_pct, capex_pct,
+                                     wc_change_pct, tax_rate, np.array(SCENARIO_WACCS)[:, None], shares_outstanding,
+                                     SCENARIO_BASE_GROWTH, SCENARIO_BASE_GROWTH,
+                                     np.array(SCENARIO_TERMINAL_GROWTHS)[None, :])
+    return pd.DataFrame(matrix, index=[f"WACC = {w}%" for w in SCENARIO_WACCS],
+                        columns=[f"Terminal Growth = {g}%" for g in SCENARIO_TERMINAL_GROWTHS])
+
+
+def ebit_terminal_sensitivity(base_revenue, forecast_years, depreciation_pct, capex_pct, wc_change_pct, tax_rate,
+                              interest_pct, shares_outstanding):
+    matrix, _ = dcf_fair_value_batch(base_revenue, forecast_years, np.array(SCENARIO_EBIT_MARGINS)[:, None],
+                                     depreciation_pct, capex_pct, wc_change_pct, tax_rate, interest_pct,
+                                     shares_outstanding, SCENARIO_BASE_GROWTH, SCENARIO_BASE_GROWTH,
+                                     np.array(SCENARIO_TERMINAL_GROWTHS)[None, :])
+    return pd.DataFrame(matrix, index=[f"EBIT Margin = {e}%" for e in SCENARIO_EBIT_MARGINS],
+                        columns=[f"Terminal Growth = {g}%" for g in SCENARIO_TERMINAL_GROWTHS])
+
+
+# Background job behind "Calculate DCF": serves the persisted result when there is one, otherwise
+# evaluates the graph node by node, publishing each finished table as a partial result
+def run_dcf_job(job, graph, sources, cache, cache_key):
+    with span("result_cache.get"):
+        dcf = cache.get(cache_key)
+    if dcf is not None:
+        return {"dcf": dcf, "from_result_cache": True, "recomputed": []}
+
+    names = graph.nodes
+    finished = []
+
+    def on_result(name, value):
+        finished.append(name)
+        job.report(len(finished) / len(names), name, **{name: value})
+
+    dcf = graph.evaluate(names, sources, on_result)
+    cache.put(cache_key, dcf)
+    return {"dcf": dcf, "from_result_cache": False, "recomputed": list(graph.recomputed)}
+
+
+def build_dcf_graph():
+    graph = ComputeGraph()
+    for fn in [base_revenue, current_price, fcf_table, valuation, base_value, growth_sensitivity,
+               wacc_terminal_sensitivity, ebit_terminal_sensitivity]:
+        graph.node(fn)
+    return graph
@@ -0,0 +1,138 @@
+import json
+import logging
+import os
+import sys
+import threading
+import time
+from collections import defaultdict, deque
+from contextlib import contextmanager
+
+import numpy as np
+
+# Off unless DCF_DIAGNOSTICS is set; when off, span() hands back one shared no-op context manager
+ENABLED = os.environ.get("DCF_DIAGNOSTICS", "").lower() in ("1", "true", "yes", "on")
+
+logger = logging.getLogger("smart_dcf.diagnostics")
+if ENABLED and not logger.handlers:
+    handler = logging.StreamHandler(sys.stderr)
+    handler.setFormatter(logging.Formatter("%(message)s"))
+    logger.addHandler(handler)
+    logger.setLevel(logging.INFO)
+    logger.propagate = False
+
+
+# Recent durations per span name, bounded so long-running servers don't grow without limit
+class SpanStats:
+    def __init__(self, max_samples=2048):
+        self._samples = defaultdict(lambda: deque(maxlen=max_samples))
+        self._counts = defaultdict(int)
+        self._lock = threading.Lock()
+
+    def record(self, name, seconds):
+        with self._lock:
+            self._samples[name].append(seconds)
+            self._counts[name] += 1
+
+    def summary(self):
+        with self._lock:
+            samples = {name: np.array(values) for name, values in self._samples.items()}
+            counts = dict(self._counts)
+        rows = []
+        for name in sorted(samples):
+            p50, p95, p99 = np.percentile(samples[name], [50, 95, 99]) * 1000
+            rows.append({"span": name, "count": counts[name], "p50_ms": p50, "p95_ms": p95, "p99_ms": p99,
+                         "max_ms": samples[name].max() * 1000})
+        return rows
+
+
+process_stats = SpanStats()
+_session = threading.local()
+
+
+# Attach the running Streamlit session so spans are also aggregated per session
+def bind_session(session_state):
+    if ENABLED:
+        _session.state = session_state
+        _session.stats = session_state.setdefault("_diagnostics", SpanStats())
+
+
+def session_stats(session_state):
+    return session_state.get("_diagnostics")
+
+
+# Per-session stats bound to this thread, for handing to work that runs on another thread
+def current_stats():
+    return getattr(_session, "stats", None)
+
+
+# Aggregates spans on a worker thread into the stats of the session that submitted the work
+@contextmanager
+def bound_stats(stats):
+    previous = getattr(_session, "stats", None)
+    _session.stats = stats
+    try:
+        yield
+    finally:
+        _session.stats = previous
+
+
+class _NullSpan:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NULL_SPAN = _NullSpan()
+
+
+class _Span:
+    def __init__(self, name):
+        self.name = name
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        seconds = time.perf_counter() - self.started
+        process_stats.record(self.name, seconds)
+        stats = getattr(_session, "stats", None)
+        if stats is not None:
+            stats.record(self.name, seconds)
+        logger.info(json.dumps({"event": "span", "span": self.name, "ms": round(seconds * 1000, 3),
+                                "ok": exc_type is None, "pid": os.getpid(), "ts": time.time()}))
+        return False
+
+
+def span(name):
+    if not ENABLED:
+        return _NULL_SPAN
+    return _Span(name)
+
+
+def _nbytes(value):
+    if hasattr(value, "memory_usage"):
+        usage = value.memory_usage(deep=True)
+        return int(usage.sum() if hasattr(usage, "sum") else usage)
+    if hasattr(value, "nbytes"):
+        return int(value.nbytes)
+    return sys.getsizeof(value)
+
+
+# Approximate size of each st.session_state entry. Frames backed by the shared statement store
+# are flagged, since they are held once per process rather than per session.
+def session_memory(session_state):
+    rows = []
+    for key in list(session_state.keys()):
+        value = session_state[key]
+        values = getattr(value, "values", None)
+        shared = isinstance(values, np.ndarray) and not values.flags.writeable
+        rows.append({"key": key, "type": type(value).__name__, "bytes": _nbytes(value), "shared": shared})
+    rows.sort(key=lambda row: row["bytes"], reverse=True)
+    if ENABLED:
+        logger.info(json.dumps({"event": "session_memory", "pid": os.getpid(), "ts": time.time(),
+                                "total_bytes": sum(row["bytes"] for row in rows),
+                                "session_bytes": sum(row["bytes"] for row in rows if not row["shared"])}))
+    return rows
@@ -0,0 +1,305 @@
+# Streaming valuation reports for one company or a whole folder of Data Sheets.
+#
+#   python export.py path/to/workbooks -o report.xlsx
+#   python export.py path/to/workbooks -o report.parquet   # report_summary.parquet, report_fcf.parquet, ...
+#
+# Reports are written as each company is valued, through openpyxl's write-only mode or the CSV /
+# Parquet result writers, so memory stays flat however many companies or grid rows are exported.
+import argparse
+import io
+import os
+import sys
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
+
+import numpy as np
+from openpyxl import Workbook
+from openpyxl.cell import WriteOnlyCell
+from openpyxl.styles import Font, PatternFill
+
+from batch_valuation import CsvResultWriter, ParquetResultWriter, find_workbooks, statement_assumptions
+from calculations import FCF_COLUMNS, valuation_verdict, value_assumptions
+from dcf_graph import DCF_SOURCES, build_dcf_graph
+from file_loader import parse_data_sheet
+from portfolio import PORTFOLIO_ASSUMPTIONS
+from statement_store import statements_from_tables
+
+SENSITIVITY_TABLES = {
+    "growth_sensitivity": "5-Year Revenue Growth Rate Sensitivity",
+    "wacc_terminal_sensitivity": "WACC vs Terminal Growth",
+    "ebit_terminal_sensitivity": "EBIT Margin vs Terminal Growth",
+}
+SUMMARY_COLUMNS = [
+    "company_name", "current_price", "fair_value", "upside_pct", "verdict", "enterprise_value", "total_pv_fcf",
+    "pv_terminal", "terminal_value", "final_fcf", "terminal_weight",
+]
+# Long-format tables of the CSV / Parquet export: section -> (columns, text columns)
+REPORT_SECTIONS = {
+    "summary": (SUMMARY_COLUMNS, {"company_name", "verdict"}),
+    "assumptions": (["company_name", "assumption", "label", "value"], {"company_name", "assumption", "label"}),
+    "fcf": (["company_name"] + FCF_COLUMNS, {"company_name", "Year"}),
+    "sensitivity": (["company_name", "table", "row", "column", "fair_value"], {"company_name", "table", "row", "column"}),
+}
+
+_HEADER_FONT = Font(bold=True)
+_HEADER_FILL = PatternFill("solid", fgColor="F0F0F0")
+_TITLE_FONT = Font(bold=True, size=12)
+_MONEY_FORMAT = "#,##0.00"
+
+
+# Everything the DCF tab shows for one company: assumptions plus the evaluated DCF graph
+def valuation_report(company_name, assumptions, dcf):
+    valuation = dcf["valuation"]
+    summary = {"company_name": company_name, "current_price": dcf["current_price"]}
+    summary.update({key: float(valuation[key]) for key in SUMMARY_COLUMNS if key in valuation})
+    if summary["current_price"]:
+        summary["verdict"], summary["upside_pct"] = valuation_verdict(summary["fair_value"], summary["current_price"])
+    return {"company_name": company_name, "assumptions": assumptions, "summary": summary, "dcf": dcf}
+
+
+def statement_report(statements, overrides=None, graph=None):
+    _, assumptions = statement_assumptions(statements)
+    assumptions.update(overrides or {})
+    frames = statements.frames()
+    sources = {"annual_pl": frames["annual_pl"], "meta": frames["meta"], **assumptions}
+    graph = graph or build_dcf_graph()
+    dcf = graph.evaluate(graph.nodes, {key: sources[key] for key in DCF_SOURCES})
+    return valuation_report(str(statements.company_name), assumptions, dcf)
+
+
+def workbook_report(path):
+    with open(path, "rb") as f:
+        return statement_report(statements_from_tables(parse_data_sheet(f.read())))
+
+
+def _try_workbook_report(path):
+    try:
+        return workbook_report(path), None
+    except Exception as e:
+        return None, f"{type(e).__name__}: {e}"
+
+
+# Sensitivity tables indexed by their row labels; the growth table carries its labels as the first column
+def _grid(table):
+    if table.dtypes.iloc[0] == object:
+        return table.set_index(table.columns[0])
+    return table
+
+
+def _header(ws, values):
+    cells = []
+    for value in values:
+        cell = WriteOnlyCell(ws, value=value)
+        cell.font = _HEADER_FONT
+        cell.fill = _HEADER_FILL
+        cells.append(cell)
+    return cells
+
+
+def _title(ws, value):
+    cell = WriteOnlyCell(ws, value=value)
+    cell.font = _TITLE_FONT
+    return [cell]
+
+
+def _money(ws, value):
+    cell = WriteOnlyCell(ws, value=value)
+    cell.number_format = _MONEY_FORMAT
+    return cell
+
+
+# Formatted workbook in openpyxl's write-only mode: rows go straight to per-sheet temp files, so
+# only the row being written is held in memory
+class ExcelReportWriter:
+    def __init__(self, target):
+        self.target = target
+        self._wb = Workbook(write_only=True)
+        self._summary = self._wb.create_sheet("Summary")
+        self._assumptions = self._wb.create_sheet("Assumptions")
+        self._fcf = self._wb.create_sheet("FCF")
+        self._terminal = self._wb.create_sheet("Terminal Value")
+        self._sensitivity = self._wb.create_sheet("Sensitivity")
+        for ws, width in [(self._summary, 16), (self._assumptions, 14), (self._fcf, 16), (self._terminal, 18),
+                          (self._sensitivity, 22)]:
+            ws.column_dimensions["A"].width = 28
+            for column in "BCDEFGHIJK":
+                ws.column_dimensions[column].width = width
+        self._summary.append(_header(self._summary, ["Company", "Current Price (₹)", "Fair Value (₹)", "Upside (%)",
+                                                     "Verdict", "Enterprise Value", "PV of FCF", "PV of Terminal Value",
+                                                     "Terminal Value", "Final Year FCF", "Terminal % of EV"]))
+        self._assumptions.append(_header(self._assumptions, ["Company"] + list(PORTFOLIO_ASSUMPTIONS.values())))
+        self._terminal.append(_header(self._terminal, ["Company", "Final Year FCF", "Terminal Growth (%)", "WACC (%)",
+                                                       "Terminal Value", "PV of Terminal Value", "Enterprise Value",
+                                                       "Terminal % of EV"]))
+
+    def write(self, report):
+        name = report["company_name"]
+        summary = report["summary"]
+        assumptions = report["assumptions"]
+        self._summary.append([name] + [_money(self._summary, summary.get(key)) if key != "verdict" else summary.get(key)
+                                       for key in SUMMARY_COLUMNS[1:]])
+        self._assumptions.append([name] + [assumptions.get(key) for key in PORTFOLIO_ASSUMPTIONS])
+        self._terminal.append([name] + [_money(self._terminal, v) for v in (
+            summary["final_fcf"], assumptions["user_growth_rate_yr_6_onwards"], assumptions["interest_pct"],
+            summary["terminal_value"], summary["pv_terminal"], summary["enterprise_value"], summary["terminal_weight"])])
+
+        self._fcf.append(_title(self._fcf, name))
+        self._fcf.append(_header(self._fcf, FCF_COLUMNS))
+        for row in report["dcf"]["fcf_table"].itertuples(index=False):
+            self._fcf.append([row[0]] + [_money(self._fcf, value) for value in row[1:]])
+        self._fcf.append([])
+
+        for key, title in SENSITIVITY_TABLES.items():
+            table = _grid(report["dcf"][key])
+            self._sensitivity.append(_title(self._sensitivity, f"{name}: {title}"))
+            self._sensitivity.append(_header(self._sensitivity, [table.index.name or ""] + list(table.columns)))
+            for label, row in table.iterrows():
+                self._sensitivity.append([str(label)] + [_money(self._sensitivity, v) if isinstance(v, float) else v
+                                                         for v in row.tolist()])
+            self._sensitivity.append([])
+
+    def close(self):
+        self._wb.save(self.target)
+
+
+# The same report as long-format CSV or Parquet tables, one file per section next to the target
+class TabularReportWriter:
+    def __init__(self, target):
+        stem, ext = os.path.splitext(target)
+        self.paths = {section: f"{stem}_{section}{ext}" for section in REPORT_SECTIONS}
+        self._writers = {}
+        for section, (columns, text_columns) in REPORT_SECTIONS.items():
+            if ext.lower() == ".parquet":
+                self._writers[section] = ParquetResultWriter(self.paths[section], columns, text_columns)
+            else:
+                self._writers[section] = CsvResultWriter(self.paths[section], columns, flush_rows=False)
+
+    def write(self, report):
+        name = report["company_name"]
+        self._writers["summary"].write(report["summary"])
+        self._writers["assumptions"].write_columns({
+            "company_name": [name] * len(PORTFOLIO_ASSUMPTIONS), "assumption": list(PORTFOLIO_ASSUMPTIONS),
+            "label": list(PORTFOLIO_ASSUMPTIONS.values()),
+            "value": [float(report["assumptions"][key]) for key in PORTFOLIO_ASSUMPTIONS]})
+        fcf = report["dcf"]["fcf_table"]
+        self._writers["fcf"].write_columns({"company_name": [name] * len(fcf), "Year": fcf["Year"].tolist(),
+                                            **{column: fcf[column].to_numpy(dtype=float) for column in FCF_COLUMNS[1:]}})
+        # Long format: one record per grid cell, skipping the growth table's text "Terminal % of EV" column
+        sensitivity = {"company_name": [], "table": [], "row": [], "column": [], "fair_value": []}
+        for key, title in SENSITIVITY_TABLES.items():
+            table = _grid(report["dcf"][key]).select_dtypes("number")
+            for label, row in table.iterrows():
+                sensitivity["row"] += [str(label)] * len(row)
+                sensitivity["column"] += [str(column) for column in row.index]
+                sensitivity["fair_value"] += row.tolist()
+            sensitivity["table"] += [title] * table.size
+        sensitivity["company_name"] = [name] * len(sensitivity["row"])
+        self._writers["sensitivity"].write_columns(sensitivity)
+
+    def close(self):
+        for writer in self._writers.values():
+            writer.close()
+
+
+# Formatted workbook of the given reports as bytes, for a download button
+def excel_report_bytes(reports):
+    buffer = io.BytesIO()
+    writer = ExcelReportWriter(buffer)
+    for report in reports:
+        writer.write(report)
+    writer.close()
+    return buffer.getvalue()
+
+
+def open_report_writer(target):
+    if target.lower().endswith(".xlsx"):
+        return ExcelReportWriter(target)
+    return TabularReportWriter(target)
+
+
+# Rows of a fair-value surface over two assumptions, produced one row at a time so an arbitrarily
+# large grid never has to exist in memory
+def surface_rows(base_revenue, assumptions, row_key, row_values, column_key, column_values):
+    column_values = np.asarray(column_values, dtype=float)
+    for value in row_values:
+        yield value, value_assumptions(base_revenue, {**assumptions, row_key: value, column_key: column_values})["fair_value"]
+
+
+# Streams a surface to .xlsx as a grid, or to .csv / .parquet as (row, column, fair_value) records
+def write_surface(target, base_revenue, assumptions, row_key, row_values, column_key, column_values):
+    rows = 0
+    if target.lower().endswith(".xlsx"):
+        wb = Workbook(write_only=True)
+        ws = wb.create_sheet("Sensitivity")
+        ws.append(_header(ws, [f"{row_key} \\ {column_key}"] + [float(v) for v in column_values]))
+        for value, fair_values in surface_rows(base_revenue, assumptions, row_key, row_values, column_key, column_values):
+            ws.append([float(value)] + fair_values.tolist())
+            rows += 1
+        wb.save(target)
+        return rows
+
+    columns = [row_key, column_key, "fair_value"]
+    writer = (ParquetResultWriter(target, columns, set(), row_group_size=65536) if target.lower().endswith(".parquet")
+              else CsvResultWriter(target, columns, flush_rows=False))
+    try:
+        column_values = np.asarray(column_values, dtype=float)
+        for value, fair_values in surface_rows(base_revenue, assumptions, row_key, row_values, column_key, column_values):
+            writer.write_columns({row_key: np.full(len(column_values), float(value)), column_key: column_values,
+                                  "fair_value": fair_values})
+            rows += 1
+    finally:
+        writer.close()
+    return rows
+
+
+def export_workbooks(paths, target, workers=None, log=sys.stderr):
+    workers = workers or os.cpu_count() or 1
+    writer = open_report_writer(target)
+    started = time.perf_counter()
+    done = failed = 0
+    try:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            # Only a small window of reports is in flight, so finished reports can't pile up ahead of
+            # the writer; they are written in folder order as the oldest one completes
+            remaining = iter(paths)
+            in_flight = deque((path, executor.submit(_try_workbook_report, path))
+                              for path in islice(remaining, 2 * workers))
+            while in_flight:
+                path, future = in_flight.popleft()
+                report, error = future.result()
+                for next_path in islice(remaining, 1):
+                    in_flight.append((next_path, executor.submit(_try_workbook_report, next_path)))
+                if error:
+                    failed += 1
+                    print(f"✗ {path}: {error}", file=log)
+                else:
+                    writer.write(report)
+                    done += 1
+    finally:
+        writer.close()
+    elapsed = time.perf_counter() - started
+    return {"companies": done, "failed": failed, "seconds": elapsed,
+            "companies_per_sec": done / elapsed if elapsed else 0.0}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Export DCF valuation reports for every Data Sheet workbook in a folder.")
+    parser.add_argument("target", help="Directory of .xlsx files or a glob pattern")
+    parser.add_argument("-o", "--output", default="valuation_report.xlsx",
+                        help="Output .xlsx, or .csv / .parquet for one long-format file per report section")
+    parser.add_argument("-w", "--workers", type=int, default=None, help="Worker processes (default: CPU count)")
+    args = parser.parse_args(argv)
+
+    paths = find_workbooks(args.target)
+    if not paths:
+        parser.error(f"No workbooks found for {args.target!r}")
+    summary = export_workbooks(paths, args.output, args.workers)
+    print(f"Exported {summary['companies']} companies ({summary['failed']} failed) in {summary['seconds']:.2f}s "
+          f"— {summary['companies_per_sec']:.1f} companies/sec → {args.output}", file=sys.stderr)
+    return 1 if summary["failed"] == len(paths) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1 +1,124 @@
+import hashlib
+import io
+from collections import Counter
+
+import numpy as np
+import openpyxl
+import pandas as pd
+
+from diagnostics import span
+
+
+def format_column_headers(headers):
+    formatted = []
+    blank_counter = 1
+    for h in headers:
+        try:
+            h_parsed = pd.to_datetime(h)
+            formatted.append(h_parsed.strftime("%b-%Y"))
+        except:
+            if pd.notnull(h) and str(h).strip():
+                formatted.append(str(h))
+            else:
+                formatted.append(f"Unnamed_{blank_counter}")
+                blank_counter += 1
+    counts = Counter()
+    unique = []
+    for h in formatted:
+        counts[h] += 1
+        unique.append(f"{h}_{counts[h]}" if counts[h] > 1 else h)
+    return unique
+
+
+# (key, label in column A, header row offset from the label, number of columns)
+SECTIONS = [
+    ("annual_pl", "PROFIT & LOSS", 1, 11),
+    ("balance_sheet", "BALANCE SHEET", 1, 11),
+    ("cashflow", "CASH FLOW:", 1, 11),
+    ("quarterly", "Quarters", 1, 11),
+    ("meta", "META", 0, 2),
+]
+
+
+# One pass over column A finds every section label, then each section's end (the first fully
+# empty row after its header) is read off a null mask that is computed once for the sheet.
+def index_sections(df, sections):
+    starts = {label: None for _, label, _, _ in sections}
+    remaining = len(starts)
+    for i, value in enumerate(df.iloc[:, 0].to_numpy()):
+        if value in starts and starts[value] is None:
+            starts[value] = i
+            remaining -= 1
+            if not remaining:
+                break
+
+    null = df.isna().to_numpy()
+    empty_rows = {}
+    index = {}
+    for key, label, start_row_offset, col_count in sections:
+        start_row = starts[label]
+        if start_row is None:
+            raise KeyError(f"Section '{label}' not found in Data Sheet")
+        if col_count not in empty_rows:
+            empty_rows[col_count] = np.flatnonzero(null[:, :col_count].all(axis=1))
+        header_row = start_row + start_row_offset
+        empty = empty_rows[col_count]
+        following = empty[np.searchsorted(empty, header_row + 1):]
+        end_row = int(following[0]) if following.size else df.shape[0]
+        index[key] = (start_row, header_row, end_row, col_count)
+    return index
+
+
+def slice_table(df, header_row, end_row, col_count):
+    headers = format_column_headers(df.iloc[header_row, 0:col_count].tolist())
+    df_temp = df.iloc[header_row + 1:end_row, 0:col_count].reset_index(drop=True).infer_objects()
+    df_temp.columns = headers
+    df_temp = df_temp.loc[:, df_temp.iloc[0].notna()]
+    return df_temp.fillna(0)
+
+
+def extract_tables(df, sections=SECTIONS):
+    index = index_sections(df, sections)
+    return {key: slice_table(df, header_row, end_row, col_count)
+            for key, (_, header_row, end_row, col_count) in index.items()}
+
+
+# Year-end share prices from the single "PRICE:" row, under the annual header so columns line up
+# with the other statements. None when the sheet has no such row.
+def extract_price_row(df, header_row, col_count=11, label="PRICE:"):
+    rows = np.flatnonzero(df.iloc[:, 0].to_numpy() == label)
+    if not rows.size:
+        return None
+    return slice_table(df.iloc[[header_row, rows[0]]], 0, 2, col_count)
+
+
+def extract_table(df, start_label, start_row_offset, col_count=11):
+    return extract_tables(df, [(start_label, start_label, start_row_offset, col_count)])[start_label]
+
+
+def read_data_sheet(file_bytes):
+    wb = openpyxl.load_workbook(io.BytesIO(file_bytes), read_only=True, data_only=True)
+    try:
+        sheet = wb["Data Sheet"]
+        return pd.DataFrame(list(sheet.values))
+    finally:
+        wb.close()
+
+
+# Pure parse step: the same bytes always give the same tables
+def parse_data_sheet(file_bytes):
+    with span("workbook.load"):
+        df_all = read_data_sheet(file_bytes)
+    with span("workbook.extract_tables"):
+        index = index_sections(df_all, SECTIONS)
+        tables = {key: slice_table(df_all, header_row, end_row, col_count)
+                  for key, (_, header_row, end_row, col_count) in index.items()}
+        tables["price"] = extract_price_row(df_all, index["annual_pl"][1])
+    tables["company_name"] = df_all.iloc[0, 1] if pd.notna(df_all.iloc[0, 1]) else "Unknown Company"
+    tables["empty_cells"] = int(df_all.isna().sum().sum())
+    return tables
+
+
+def workbook_hash(file_bytes):
+    return hashlib.sha256(file_bytes).hexdigest()
 
@@ -0,0 +1,308 @@
+# On-disk columnar store of parsed Data Sheets for screening a whole universe without reopening xlsx.
+#
+#   python fundamentals_store.py ingest path/to/workbooks --store fundamentals
+#   python fundamentals_store.py screen "ebit_margin > 15 and sales_cagr_5y > 12" --store fundamentals
+#
+# The store is a directory of uncompressed Arrow IPC files, memory-mapped on open so columns are
+# read zero-copy straight into NumPy:
+#   companies.arrow   one row per company, with the row range of its block in the two tables below
+#   line_items.arrow  company x year x line item values from every statement (long layout)
+#   metrics.arrow     company x year derived metrics (the Inputs-tab ratios, growth, CAGRs, price)
+import argparse
+import operator
+import os
+import re
+import sys
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.ipc as ipc
+
+from batch_valuation import find_workbooks
+from calculations import derive_assumptions_history
+from file_loader import parse_data_sheet, workbook_hash
+from statement_store import STATEMENT_KEYS, meta_value, statements_from_tables
+
+# Statements stored as line items; meta is kept on the company row instead
+LINE_ITEM_STATEMENTS = [key for key in STATEMENT_KEYS if key != "meta"] + ["price"]
+METRIC_COLUMNS = [
+    "sales", "ebit", "ebit_margin", "tax_rate", "depreciation_pct", "shares_outstanding", "net_profit",
+    "price", "sales_growth", "sales_cagr_3y", "sales_cagr_5y", "profit_cagr_5y",
+]
+OPERATORS = {">": operator.gt, ">=": operator.ge, "<": operator.lt, "<=": operator.le, "==": operator.eq,
+             "!=": operator.ne}
+
+
+def _period_years(columns):
+    dates = pd.to_datetime(pd.Series(columns, dtype=object), format="%b-%Y", errors="coerce")
+    return dates.dt.year.fillna(-1).astype(np.int16).to_numpy()
+
+
+def _cagr(values, years):
+    with np.errstate(divide="ignore", invalid="ignore"):
+        start = np.concatenate([np.full(years, np.nan), values[:-years]]) if len(values) > years else np.full(len(values), np.nan)
+        growth = ((values / start) ** (1 / years) - 1) * 100
+    return np.where(np.isfinite(growth), growth, np.nan)
+
+
+# Derived metrics for every reported year of one company, from the same ratios the Inputs tab shows
+def company_metrics(frames):
+    history = derive_assumptions_history(frames["annual_pl"], frames["balance_sheet"])
+    sales = history["base_revenue"].to_numpy()
+    annual_pl = frames["annual_pl"]
+    net_profit = (annual_pl.loc["Net profit"].to_numpy(dtype=float) if "Net profit" in annual_pl.index
+                  else np.full(len(sales), np.nan))
+    price = np.full(len(sales), np.nan)
+    if frames.get("price") is not None:
+        price = frames["price"].iloc[0].reindex(history.index).to_numpy(dtype=float)
+        price[price <= 0] = np.nan
+    return pd.DataFrame({
+        "period": history.index.astype(str),
+        "year": _period_years(history.index),
+        "sales": sales,
+        "ebit": history["ebit"].to_numpy(),
+        "ebit_margin": history["ebit_margin"].to_numpy(),
+        "tax_rate": history["tax_rate"].to_numpy(),
+        "depreciation_pct": history["depreciation_pct"].to_numpy(),
+        "shares_outstanding": history["shares_outstanding"].to_numpy(),
+        "net_profit": net_profit,
+        "price": price,
+        "sales_growth": _cagr(sales, 1),
+        "sales_cagr_3y": _cagr(sales, 3),
+        "sales_cagr_5y": _cagr(sales, 5),
+        "profit_cagr_5y": _cagr(net_profit, 5),
+    })
+
+
+def _line_items(frames):
+    blocks = []
+    for statement in LINE_ITEM_STATEMENTS:
+        frame = frames.get(statement)
+        if frame is None:
+            continue
+        values = frame.to_numpy(dtype=float)
+        blocks.append(pd.DataFrame({
+            "statement": statement,
+            "line_item": np.repeat(frame.index.astype(str).to_numpy(), values.shape[1]),
+            "period": np.tile(frame.columns.astype(str).to_numpy(), values.shape[0]),
+            "year": np.tile(_period_years(frame.columns), values.shape[0]),
+            "value": values.ravel(),
+        }))
+    return pd.concat(blocks, ignore_index=True)
+
+
+# Parse one workbook into the rows it contributes to each table (runs in a worker process)
+def extract_company(path):
+    with open(path, "rb") as f:
+        file_bytes = f.read()
+    statements = statements_from_tables(parse_data_sheet(file_bytes), workbook_hash(file_bytes))
+    frames = statements.frames()
+
+    def meta(label):
+        try:
+            return meta_value(frames["meta"], label)
+        except Exception:
+            return np.nan
+
+    company = {"company_name": str(statements.company_name), "file": path, "content_hash": statements.content_hash,
+               "current_price": meta("Current Price"), "market_cap": meta("Market Capitalization")}
+    return company, _line_items(frames), company_metrics(frames)
+
+
+def _try_extract_company(path):
+    try:
+        return extract_company(path), None
+    except Exception as e:
+        return None, f"{type(e).__name__}: {e}"
+
+
+# Built column by column so float NaN stays NaN rather than becoming an Arrow null, which keeps
+# numeric columns readable zero-copy
+def _to_arrow(frame):
+    arrays = {}
+    for name in frame.columns:
+        column = frame[name]
+        if isinstance(column.dtype, pd.CategoricalDtype):
+            arrays[name] = pa.DictionaryArray.from_arrays(column.cat.codes.to_numpy(dtype=np.int32),
+                                                          pa.array(column.cat.categories.astype(str)))
+        elif column.dtype.kind in "biuf":
+            arrays[name] = pa.array(column.to_numpy())
+        else:
+            arrays[name] = pa.array(column.astype(str).tolist(), type=pa.string())
+    return pa.table(arrays)
+
+
+def _write_table(path, frame):
+    table = _to_arrow(frame)
+    tmp = path + ".tmp"
+    with pa.OSFile(tmp, "wb") as sink, ipc.new_file(sink, table.schema) as writer:
+        writer.write_table(table)
+    os.replace(tmp, path)
+
+
+def _read_table(path):
+    with pa.memory_map(path, "r") as source:
+        return ipc.open_file(source).read_all()
+
+
+# Adds workbooks to the store; companies already held (same content hash) are skipped and a newer
+# workbook for the same company name replaces the old block, whether that block is already in the
+# store or comes from an older file in the same ingest (by modification time)
+def ingest(paths, root, workers=None, log=sys.stderr):
+    os.makedirs(root, exist_ok=True)
+    existing = FundamentalsStore(root) if os.path.exists(os.path.join(root, "companies.arrow")) else None
+    known = set(existing.companies["content_hash"]) if existing else set()
+
+    latest = {}
+    failed = 0
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        for path, (extracted, error) in zip(paths, executor.map(_try_extract_company, paths, chunksize=16)):
+            if not error and not len(extracted[2]):
+                error = "no reported years"
+            if error:
+                failed += 1
+                print(f"✗ {path}: {error}", file=log)
+            elif extracted[0]["content_hash"] not in known:
+                known.add(extracted[0]["content_hash"])
+                name = extracted[0]["company_name"]
+                modified = os.path.getmtime(path)
+                if name not in latest or modified >= latest[name][0]:
+                    latest[name] = (modified, *extracted)
+
+    companies = [company for _, company, _, _ in latest.values()]
+    line_items = [items for _, _, items, _ in latest.values()]
+    metrics = [block for _, _, _, block in latest.values()]
+    added = len(companies)
+    if existing:
+        new_names = {company["company_name"] for company in companies}
+        for company_id, company in existing.companies.iterrows():
+            if company["company_name"] not in new_names:
+                companies.append(company[["company_name", "file", "content_hash", "current_price", "market_cap"]].to_dict())
+                line_items.append(existing.line_items_for(company_id))
+                metrics.append(existing.metrics_for(company_id))
+        existing.close()
+    if not companies:
+        return {"added": 0, "failed": failed, "companies": 0}
+
+    # Blocks are written contiguously per company so companies.arrow can index them by row range
+    df_companies = pd.DataFrame(companies)
+    for name, blocks in [("line_items", line_items), ("metrics", metrics)]:
+        sizes = np.array([len(block) for block in blocks])
+        df_companies[f"{name}_end"] = np.cumsum(sizes)
+        df_companies[f"{name}_start"] = df_companies[f"{name}_end"] - sizes
+        table = pd.concat(blocks, ignore_index=True)
+        table.insert(0, "company_id", np.repeat(np.arange(len(blocks), dtype=np.int32), sizes))
+        if name == "line_items":
+            for column in ["statement", "line_item", "period"]:
+                table[column] = table[column].astype("category")
+        _write_table(os.path.join(root, f"{name}.arrow"), table)
+    _write_table(os.path.join(root, "companies.arrow"), df_companies)
+    return {"added": added, "failed": failed, "companies": len(df_companies)}
+
+
+# Read side of the store. Numeric metric columns are zero-copy NumPy views of the mapped files.
+class FundamentalsStore:
+    def __init__(self, root):
+        self.root = root
+        self.companies = _read_table(os.path.join(root, "companies.arrow")).to_pandas()
+        self._metrics = _read_table(os.path.join(root, "metrics.arrow"))
+        self._line_items = None
+        self._columns = {}
+        self.company_id = self.column("company_id")
+        self.year = self.column("year")
+        # Screening index: row of each company's latest reported year (none for a company without rows)
+        metrics_start = self.companies["metrics_start"].to_numpy()
+        metrics_end = self.companies["metrics_end"].to_numpy()
+        self.latest_rows = (metrics_end - 1)[metrics_end > metrics_start]
+
+    def column(self, name):
+        if name not in self._columns:
+            column = self._metrics.column(name)
+            if column.num_chunks == 1 and column.null_count == 0:
+                self._columns[name] = column.chunk(0).to_numpy(zero_copy_only=True)
+            else:
+                self._columns[name] = column.to_numpy()
+        return self._columns[name]
+
+    @property
+    def line_items(self):
+        if self._line_items is None:
+            self._line_items = _read_table(os.path.join(self.root, "line_items.arrow"))
+        return self._line_items
+
+    def metrics_for(self, company_id):
+        start, end = self.companies.loc[company_id, ["metrics_start", "metrics_end"]]
+        return self._metrics.slice(start, end - start).drop_columns(["company_id"]).to_pandas()
+
+    def line_items_for(self, company_id):
+        start, end = self.companies.loc[company_id, ["line_items_start", "line_items_end"]]
+        frame = self.line_items.slice(start, end - start).drop_columns(["company_id"]).to_pandas()
+        return frame.astype({"statement": str, "line_item": str, "period": str})
+
+    # filters: (metric, operator, value) triples, all of which must hold. year=None screens each
+    # company's latest reported year, otherwise that fiscal year.
+    def screen(self, filters, year=None):
+        rows = self.latest_rows if year is None else np.flatnonzero(self.year == year)
+        mask = np.ones(len(rows), dtype=bool)
+        for metric, op, value in filters:
+            mask &= OPERATORS[op](self.column(metric)[rows], value)
+        rows = rows[mask]
+        result = pd.DataFrame({"company_name": self.companies["company_name"].to_numpy()[self.company_id[rows]],
+                               "year": self.year[rows]})
+        for metric in METRIC_COLUMNS:
+            result[metric] = self.column(metric)[rows]
+        return result
+
+    def close(self):
+        self._columns.clear()
+        self._metrics = self._line_items = None
+
+
+# "ebit_margin > 15 and sales_cagr_5y > 12" -> [("ebit_margin", ">", 15.0), ("sales_cagr_5y", ">", 12.0)]
+def parse_screen(text):
+    filters = []
+    for clause in re.split(r"\s+and\s+", text.strip(), flags=re.IGNORECASE):
+        match = re.fullmatch(r"\s*(\w+)\s*(>=|<=|==|!=|>|<)\s*(-?[\d.]+)\s*%?\s*", clause)
+        if not match or match.group(1) not in METRIC_COLUMNS:
+            raise ValueError(f"Cannot parse screen clause {clause!r}; use <metric> <op> <number> with metrics "
+                             f"{', '.join(METRIC_COLUMNS)}")
+        filters.append((match.group(1), match.group(2), float(match.group(3))))
+    return filters
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Build and screen a columnar store of Data Sheet fundamentals.")
+    commands = parser.add_subparsers(dest="command", required=True)
+    ingest_parser = commands.add_parser("ingest", help="Add workbooks to the store")
+    ingest_parser.add_argument("target", help="Directory of .xlsx files or a glob pattern")
+    ingest_parser.add_argument("-w", "--workers", type=int, default=None, help="Worker processes (default: CPU count)")
+    screen_parser = commands.add_parser("screen", help="List companies matching every condition")
+    screen_parser.add_argument("query", help='e.g. "ebit_margin > 15 and sales_cagr_5y > 12"')
+    screen_parser.add_argument("--year", type=int, default=None, help="Fiscal year to screen (default: latest per company)")
+    for sub in (ingest_parser, screen_parser):
+        sub.add_argument("--store", default="fundamentals", help="Store directory")
+    args = parser.parse_args(argv)
+
+    if args.command == "ingest":
+        paths = find_workbooks(args.target)
+        if not paths:
+            parser.error(f"No workbooks found for {args.target!r}")
+        summary = ingest(paths, args.store, args.workers)
+        print(f"Added {summary['added']} companies ({summary['failed']} failed); {summary['companies']} in "
+              f"{args.store}", file=sys.stderr)
+        return 0
+
+    try:
+        filters = parse_screen(args.query)
+    except ValueError as e:
+        parser.error(str(e))
+    matches = FundamentalsStore(args.store).screen(filters, args.year)
+    print(matches.to_string(index=False))
+    print(f"{len(matches)} companies match", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
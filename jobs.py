@@ -0,0 +1,100 @@
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor, wait
+
+from diagnostics import bound_stats, current_stats
+
+
+class JobCancelled(Exception):
+    pass
+
+
+# One unit of background work. The function running it calls report() between steps to publish
+# progress and partial results; report() raises JobCancelled once the job has been cancelled.
+class Job:
+    def __init__(self, key):
+        self.key = key
+        self.status = "queued"
+        self.progress = 0.0
+        self.message = ""
+        self.result = None
+        self.error = None
+        self.future = None
+        self._partial = {}
+        self._cancel = threading.Event()
+        self._lock = threading.Lock()
+
+    @property
+    def done(self):
+        return self.status in ("done", "failed", "cancelled")
+
+    @property
+    def cancelled(self):
+        return self._cancel.is_set()
+
+    def cancel(self):
+        self._cancel.set()
+        if self.future is not None and self.future.cancel():
+            self.status = "cancelled"
+
+    def report(self, progress, message="", **partial):
+        if self.cancelled:
+            raise JobCancelled(self.key)
+        with self._lock:
+            self.progress = progress
+            self.message = message
+            self._partial.update(partial)
+
+    def partial(self):
+        with self._lock:
+            return dict(self._partial)
+
+    def wait(self, timeout=None):
+        if self.future is not None:
+            wait([self.future], timeout=timeout)
+        return self.done
+
+
+# Runs jobs on a shared thread pool. Each session keeps its jobs in a dict of slots (one current
+# job per slot): resubmitting the same key returns the existing job, a new key cancels the old one.
+class JobRunner:
+    def __init__(self, max_workers=None):
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="dcf-job")
+
+    def submit(self, jobs, slot, key, fn, *args):
+        current = jobs.get(slot)
+        if current is not None and current.key == key and current.status not in ("failed", "cancelled"):
+            return current
+        if current is not None and not current.done:
+            current.cancel()
+        job = Job(key)
+        jobs[slot] = job
+        # Spans recorded by the job still count towards the submitting session's diagnostics
+        job.future = self._executor.submit(self._run, job, fn, args, current_stats())
+        return job
+
+    # Inputs changed since the job in this slot was submitted: stop it rather than finish stale work
+    def cancel_stale(self, jobs, slot, key):
+        current = jobs.get(slot)
+        if current is not None and current.key != key and not current.done:
+            current.cancel()
+
+    @staticmethod
+    def _run(job, fn, args, stats):
+        if job.cancelled:
+            job.status = "cancelled"
+            return
+        job.status = "running"
+        try:
+            with bound_stats(stats):
+                job.result = fn(job, *args)
+            job.progress = 1.0
+            job.status = "done"
+        except JobCancelled:
+            job.status = "cancelled"
+        except Exception as e:
+            job.error = e
+            job.status = "failed"
+
+
+job_runner = JobRunner(max_workers=int(os.environ.get("DCF_JOB_WORKERS", 0)) or None)
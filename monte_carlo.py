@@ -0,0 +1,76 @@
+import numpy as np
+
+from calculations import dcf_batch
+
+# Assumptions that get a normal distribution around the value entered in the Inputs tab
+MC_ASSUMPTIONS = {
+    "growth_rate_1_2": "Growth Y1 & Y2 (%)",
+    "growth_rate_3_4_5": "Growth Y3 to Y5 (%)",
+    "ebit_margin": "EBIT Margin (%)",
+    "interest_pct": "WACC (%)",
+    "terminal_growth": "Terminal Growth Rate (%)",
+    "capex_pct": "CapEx (% of Revenue)",
+    "wc_change_pct": "Working Capital Changes (% of Revenue)",
+}
+
+DEFAULT_SPREADS = {
+    "growth_rate_1_2": 3.0,
+    "growth_rate_3_4_5": 3.0,
+    "ebit_margin": 2.0,
+    "interest_pct": 1.0,
+    "terminal_growth": 0.5,
+    "capex_pct": 0.5,
+    "wc_change_pct": 0.5,
+}
+
+
+def _simulate_chunk(rng, size, base_revenue, forecast_years, assumptions, spreads, shares):
+    draws = {}
+    for name in MC_ASSUMPTIONS:
+        draws[name] = assumptions[name] + spreads.get(name, 0.0) * rng.standard_normal(size)
+    # Year 6 onwards grows at the terminal rate, as in the DCF tab
+    result = dcf_batch(base_revenue, forecast_years, draws["ebit_margin"], assumptions["depreciation_pct"],
+                       draws["capex_pct"], draws["wc_change_pct"], assumptions["tax_rate"], draws["interest_pct"],
+                       draws["growth_rate_1_2"], draws["growth_rate_3_4_5"], draws["terminal_growth"],
+                       draws["terminal_growth"], shares)
+    # A path whose WACC does not exceed terminal growth has no finite terminal value
+    valid = (draws["interest_pct"] > draws["terminal_growth"]) & np.isfinite(result["fair_value"])
+    return result["fair_value"][valid]
+
+
+# Monte Carlo valuation: paths are drawn and valued in chunks so peak memory depends on
+# chunk_size, not on the number of paths.
+def run_monte_carlo(base_revenue, forecast_years, assumptions, spreads, shares, current_price=None,
+                    paths=100_000, chunk_size=50_000, bins=50, seed=None):
+    rng = np.random.default_rng(seed)
+    fair_values = np.empty(paths)
+    filled = 0
+    remaining = paths
+    while remaining > 0:
+        size = min(chunk_size, remaining)
+        chunk = _simulate_chunk(rng, size, base_revenue, forecast_years, assumptions, spreads, shares)
+        fair_values[filled:filled + chunk.size] = chunk
+        filled += chunk.size
+        remaining -= size
+    fair_values = fair_values[:filled]
+
+    if not filled:
+        return {"paths": paths, "valid_paths": 0}
+
+    p5, p50, p95 = np.percentile(fair_values, [5, 50, 95])
+    # Clip the histogram range so a few near r == g paths don't flatten every bar
+    low, high = np.percentile(fair_values, [0.5, 99.5])
+    counts, edges = np.histogram(fair_values, bins=bins, range=(low, high) if high > low else None)
+    result = {
+        "paths": paths,
+        "valid_paths": int(filled),
+        "mean": float(fair_values.mean()),
+        "p5": float(p5),
+        "p50": float(p50),
+        "p95": float(p95),
+        "hist_counts": counts,
+        "hist_edges": edges,
+    }
+    if current_price:
+        result["prob_undervalued"] = float(np.mean(fair_values > current_price))
+    return result
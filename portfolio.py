@@ -0,0 +1,113 @@
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from concurrent.futures.process import BrokenProcessPool
+
+from batch_valuation import statement_assumptions, value_statements
+from file_loader import parse_data_sheet, workbook_hash
+from statement_store import statement_store, statements_from_tables
+
+# Per-company assumptions editable in the Portfolio tab (session-state key -> column label)
+PORTFOLIO_ASSUMPTIONS = {
+    "user_growth_rate_yr_1_2": "Growth Y1-2 (%)",
+    "user_growth_rate_yr_3_4_5": "Growth Y3-5 (%)",
+    "user_growth_rate_yr_6_onwards": "Terminal Growth (%)",
+    "forecast_years": "Forecast Years",
+    "interest_pct": "WACC (%)",
+    "ebit_margin": "EBIT Margin (%)",
+    "tax_rate": "Tax Rate (%)",
+    "depreciation_pct": "Depreciation (%)",
+    "capex_pct": "CapEx (%)",
+    "wc_change_pct": "WC Change (%)",
+    "shares_outstanding": "Shares (Cr)",
+}
+
+_executor = None
+
+
+# Parsing is pure-Python openpyxl work, so it runs in a process pool kept for the life of the server.
+# Workers come from a forkserver: forking the multi-threaded server could copy a lock another thread
+# holds (logging, the LRU caches, BLAS) into a child that then deadlocks on it.
+def _get_executor():
+    global _executor
+    if _executor is None:
+        _executor = ProcessPoolExecutor(max_workers=int(os.environ.get("DCF_PORTFOLIO_WORKERS", 0)) or None,
+                                        mp_context=multiprocessing.get_context("forkserver"))
+    return _executor
+
+
+# A crashed worker poisons the pool; start a fresh one on the next import
+def _reset_executor():
+    global _executor
+    _executor = None
+
+
+def _parse_statements(file_bytes, content_hash):
+    return statements_from_tables(parse_data_sheet(file_bytes), content_hash)
+
+
+# Import many workbooks at once: files already in the statement store are reused, the rest are parsed
+# concurrently and added to it. Returns one entry per file with either statements or an error.
+def load_portfolio(files, on_progress=None):
+    entries = []
+    pending = {}
+    for name, file_bytes in files:
+        content_hash = workbook_hash(file_bytes)
+        entry = {"file": name, "content_hash": content_hash, "statements": statement_store.get(content_hash)}
+        entries.append(entry)
+        if entry["statements"] is None:
+            # Identical uploads are parsed once
+            pending.setdefault(content_hash, (file_bytes, []))[1].append(entry)
+
+    done = len(entries) - sum(len(waiting) for _, waiting in pending.values())
+    if on_progress:
+        on_progress(done, len(entries))
+    if pending:
+        executor = _get_executor()
+        futures = {executor.submit(_parse_statements, file_bytes, content_hash): content_hash
+                   for content_hash, (file_bytes, _) in pending.items()}
+        for future in as_completed(futures):
+            content_hash = futures[future]
+            waiting = pending[content_hash][1]
+            try:
+                statements = future.result()
+                statement_store.put(content_hash, statements)
+                for entry in waiting:
+                    entry["statements"] = statements
+            except Exception as e:
+                if isinstance(e, BrokenProcessPool):
+                    _reset_executor()
+                for entry in waiting:
+                    entry["error"] = f"{type(e).__name__}: {e}"
+            done += len(waiting)
+            if on_progress:
+                on_progress(done, len(entries))
+
+    for entry in entries:
+        if entry["statements"] is not None and "error" not in entry:
+            try:
+                entry["base_revenue"], entry["assumptions"] = statement_assumptions(entry["statements"])
+            except Exception as e:
+                entry["error"] = f"{type(e).__name__}: {e}"
+    return entries
+
+
+# Revalue only the companies whose assumptions differ from the last run; results maps
+# content hash -> (assumptions, row) and is updated in place
+def revalue_portfolio(companies, assumptions, results):
+    recomputed = []
+    for content_hash, statements in companies.items():
+        company_assumptions = assumptions[content_hash]
+        previous = results.get(content_hash)
+        if previous is not None and previous[0] == company_assumptions:
+            continue
+        try:
+            row = value_statements(statements, company_assumptions)
+        except Exception as e:
+            row = {"company_name": str(statements.company_name), "error": f"{type(e).__name__}: {e}"}
+        results[content_hash] = (dict(company_assumptions), row)
+        recomputed.append(content_hash)
+    for content_hash in list(results):
+        if content_hash not in companies:
+            del results[content_hash]
+    return recomputed
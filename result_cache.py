@@ -0,0 +1,163 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+
+import numpy as np
+import pandas as pd
+
+from calculations import MODEL_VERSION
+
+DEFAULT_PATH = os.environ.get(
+    "DCF_RESULT_CACHE", os.path.join(os.path.expanduser("~"), ".cache", "smart-dcf-bot", "results.sqlite"))
+DEFAULT_MAX_BYTES = int(os.environ.get("DCF_RESULT_CACHE_MAX_BYTES", 256 * 1024 * 1024))
+
+
+# Key for one valuation: workbook content hash plus a canonical encoding of the assumption vector,
+# so 10 and 10.0 or a different dict order map to the same entry
+def result_key(content_hash, assumptions):
+    encoded = json.dumps({key: float(value) for key, value in assumptions.items()}, sort_keys=True)
+    return hashlib.sha256(f"{content_hash}:{encoded}".encode()).hexdigest()
+
+
+# Payloads are JSON rather than pickle: the cache file is shared and writable, and unpickling a
+# tampered row would run arbitrary code. DataFrames are stored as labelled columns; floats (inf and
+# NaN included) round-trip exactly through json's repr.
+def _encode(value):
+    if isinstance(value, pd.DataFrame):
+        index = None if isinstance(value.index, pd.RangeIndex) else value.index.tolist()
+        return {"__frame__": {"index": index, "index_name": value.index.name, "columns": value.columns.tolist(),
+                              "data": [value[column].tolist() for column in value.columns]}}
+    if isinstance(value, dict):
+        return {key: _encode(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_encode(item) for item in value]
+    if isinstance(value, np.generic):
+        return value.item()
+    return value
+
+
+def _decode(value):
+    if isinstance(value, dict):
+        frame = value.get("__frame__")
+        if frame is not None:
+            df = pd.DataFrame(dict(enumerate(frame["data"])), index=frame["index"])
+            df.columns = frame["columns"]
+            df.index.name = frame["index_name"]
+            return df
+        return {key: _decode(item) for key, item in value.items()}
+    if isinstance(value, list):
+        return [_decode(item) for item in value]
+    return value
+
+
+# Persistent valuation cache in SQLite, shared by every Streamlit worker process and surviving
+# restarts. WAL mode lets readers run alongside a writer and the least recently read entries are
+# evicted past max_bytes. Entries are keyed by MODEL_VERSION, so processes on different versions
+# (a rolling deploy) never see each other's results; stale versions simply age out by eviction.
+# The cache is optional: any SQLite or filesystem error counts as a miss or a skipped write.
+class ResultCache:
+    def __init__(self, path=DEFAULT_PATH, max_bytes=DEFAULT_MAX_BYTES, version=MODEL_VERSION):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.version = version
+        self.hits = 0
+        self.misses = 0
+        self._local = threading.local()
+
+    def _connect(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+            conn = sqlite3.connect(self.path, timeout=30)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            with conn:
+                conn.execute("""CREATE TABLE IF NOT EXISTS results (
+                    key TEXT PRIMARY KEY, version TEXT NOT NULL, created REAL NOT NULL,
+                    accessed REAL NOT NULL, size INTEGER NOT NULL, payload BLOB NOT NULL)""")
+                conn.execute("CREATE INDEX IF NOT EXISTS results_accessed ON results (accessed)")
+            self._local.conn = conn
+        return conn
+
+    def _row_key(self, key):
+        return f"{self.version}:{key}"
+
+    def get(self, key):
+        try:
+            value = self._get(self._row_key(key))
+        except (sqlite3.Error, OSError):
+            value = None
+        if value is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return value
+
+    def _get(self, row_key):
+        conn = self._connect()
+        row = conn.execute("SELECT payload FROM results WHERE key = ? AND version = ?",
+                           (row_key, self.version)).fetchone()
+        if row is None:
+            return None
+        try:
+            value = _decode(json.loads(row[0]))
+        except Exception:
+            # Corrupt, or written in an older format: drop the row and recompute
+            with conn:
+                conn.execute("DELETE FROM results WHERE key = ?", (row_key,))
+            return None
+        with conn:
+            conn.execute("UPDATE results SET accessed = ? WHERE key = ?", (time.time(), row_key))
+        return value
+
+    def put(self, key, value):
+        payload = json.dumps(_encode(value)).encode()
+        if len(payload) > self.max_bytes:
+            return
+        try:
+            self._put(self._row_key(key), payload)
+        except (sqlite3.Error, OSError):
+            pass
+
+    def _put(self, row_key, payload):
+        conn = self._connect()
+        now = time.time()
+        with conn:
+            conn.execute("INSERT OR REPLACE INTO results (key, version, created, accessed, size, payload) "
+                         "VALUES (?, ?, ?, ?, ?, ?)", (row_key, self.version, now, now, len(payload), payload))
+            total = conn.execute("SELECT COALESCE(SUM(size), 0) FROM results").fetchone()[0]
+            if total > self.max_bytes:
+                evicted = 0
+                for old_key, size in conn.execute("SELECT key, size FROM results WHERE key != ? ORDER BY accessed",
+                                                  (row_key,)).fetchall():
+                    conn.execute("DELETE FROM results WHERE key = ?", (old_key,))
+                    evicted += size
+                    if total - evicted <= self.max_bytes:
+                        break
+
+    def get_or_compute(self, key, compute):
+        value = self.get(key)
+        if value is None:
+            value = compute()
+            self.put(key, value)
+        return value
+
+    def clear(self):
+        with self._connect() as conn:
+            conn.execute("DELETE FROM results")
+
+    def stats(self):
+        stats = {"hits": self.hits, "misses": self.misses, "max_bytes": self.max_bytes, "version": self.version,
+                 "path": self.path}
+        try:
+            stats["entries"], stats["bytes"] = self._connect().execute(
+                "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM results").fetchone()
+        except (sqlite3.Error, OSError) as e:
+            stats["error"] = f"{type(e).__name__}: {e}"
+        return stats
+
+
+result_cache = ResultCache()
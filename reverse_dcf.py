@@ -0,0 +1,79 @@
+import numpy as np
+
+from calculations import dcf_fair_value_batch
+
+# Default search brackets (in %) for each assumption the solver can back out of a price.
+# The WACC bracket starts just above terminal growth, where the terminal value is finite.
+SOLVE_BRACKETS = {
+    "growth_1_5": (-50.0, 100.0),
+    "ebit_margin": (-50.0, 100.0),
+    "interest_pct": (None, 100.0),
+}
+
+
+def _fair_value(solve_for, x, model):
+    fair_value, _ = dcf_fair_value_batch(**{**model, solve_for: x})
+    return fair_value
+
+
+# Reverse DCF: find the value of one dcf_fair_value input that makes the fair value equal
+# target_price. Every argument may be an array, so a whole portfolio or an implied-growth surface
+# is solved in one batched call. Uses the Illinois variant of false position, which keeps the root
+# bracketed, and falls back to bisection whenever the secant step leaves the bracket.
+def implied_assumption(target_price, solve_for, model, lower=None, upper=None, xtol=1e-8, ftol=1e-10,
+                       max_iter=100):
+    default_lower, default_upper = SOLVE_BRACKETS[solve_for]
+    if lower is None:
+        lower = default_lower if default_lower is not None else np.asarray(model["terminal_growth"]) + 1e-6
+    if upper is None:
+        upper = default_upper
+
+    model = {key: value for key, value in model.items() if key != solve_for}
+    target = np.asarray(target_price, dtype=float)
+    shape = np.broadcast_shapes(target.shape, np.shape(lower), np.shape(upper),
+                                *(np.shape(value) for value in model.values()))
+    target = np.broadcast_to(target, shape)
+    a = np.broadcast_to(np.asarray(lower, dtype=float), shape).copy()
+    b = np.broadcast_to(np.asarray(upper, dtype=float), shape).copy()
+
+    with np.errstate(divide="ignore", invalid="ignore", over="ignore"):
+        fa = _fair_value(solve_for, a, model) - target
+        fb = _fair_value(solve_for, b, model) - target
+    bracketed = np.isfinite(fa) & np.isfinite(fb) & (np.sign(fa) != np.sign(fb))
+
+    x = np.where(fa == 0, a, b)
+    fx = np.where(fa == 0, fa, fb)
+    iterations = np.zeros(shape, dtype=int)
+    converged = bracketed & ((fa == 0) | (fb == 0))
+    active = bracketed & ~converged
+
+    for iteration in range(1, max_iter + 1):
+        if not active.any():
+            break
+        with np.errstate(divide="ignore", invalid="ignore", over="ignore"):
+            c = b - fb * (b - a) / (fb - fa)
+            outside = ~np.isfinite(c) | (c <= np.minimum(a, b)) | (c >= np.maximum(a, b))
+            c = np.where(outside, (a + b) / 2, c)
+            fc = _fair_value(solve_for, c, model) - target
+
+        crossed = np.sign(fc) != np.sign(fb)
+        a = np.where(active & crossed, b, a)
+        fa = np.where(active & crossed, fb, np.where(active, fa / 2, fa))
+        b = np.where(active, c, b)
+        fb = np.where(active, fc, fb)
+        x = np.where(active, c, x)
+        fx = np.where(active, fc, fx)
+        iterations = np.where(active, iteration, iterations)
+
+        done = active & ((np.abs(b - a) <= xtol) | (np.abs(fc) <= ftol * np.maximum(np.abs(target), 1.0)))
+        converged |= done
+        active &= ~done
+
+    return {
+        "value": np.where(bracketed, x, np.nan),
+        "converged": converged,
+        "bracketed": bracketed,
+        "iterations": iterations,
+        "residual": np.where(bracketed, fx, np.nan),
+        "bracket_width": np.where(bracketed, np.abs(b - a), np.nan),
+    }
@@ -0,0 +1,90 @@
+import os
+
+import numpy as np
+import pandas as pd
+
+from cache import LRUCache
+from file_loader import parse_data_sheet, workbook_hash
+
+STATEMENT_KEYS = ["annual_pl", "balance_sheet", "cashflow", "quarterly", "meta"]
+
+
+# One parsed statement held as an immutable float64 block. frame() is a read-only view of the
+# block, never a copy; lookups go through its label index.
+class Statement:
+    def __init__(self, labels, columns, values, label_name=None):
+        values = np.ascontiguousarray(values, dtype=np.float64)
+        values.flags.writeable = False
+        self.values = values
+        self.labels = tuple(labels)
+        self.columns = tuple(columns)
+        self.label_name = label_name
+        self._frame = None
+
+    @classmethod
+    def from_table(cls, table):
+        labels = [str(label) for label in table.iloc[:, 0]]
+        numeric = table.iloc[:, 1:].apply(pd.to_numeric, errors="coerce")
+        return cls(labels, table.columns[1:], numeric.to_numpy(dtype=np.float64), table.columns[0])
+
+    # Label-indexed DataFrame over the shared block, built once per statement
+    def frame(self):
+        if self._frame is None:
+            self._frame = pd.DataFrame(self.values, index=pd.Index(self.labels, name=self.label_name),
+                                       columns=list(self.columns), copy=False)
+        return self._frame
+
+    # Pickle only the block and labels, so copies sent between processes come back read-only
+    # and without the cached frame
+    def __reduce__(self):
+        return Statement, (self.labels, self.columns, self.values, self.label_name)
+
+    @property
+    def nbytes(self):
+        return self.values.nbytes
+
+
+# Every statement of one workbook, keyed by the SHA-256 of its bytes
+class StatementSet:
+    def __init__(self, content_hash, company_name, empty_cells, statements):
+        self.content_hash = content_hash
+        self.company_name = company_name
+        self.empty_cells = empty_cells
+        self._statements = statements
+
+    def __getitem__(self, key):
+        return self._statements[key]
+
+    def __contains__(self, key):
+        return key in self._statements
+
+    def frames(self):
+        return {key: statement.frame() for key, statement in self._statements.items()}
+
+    @property
+    def nbytes(self):
+        return sum(statement.nbytes for statement in self._statements.values())
+
+
+def statements_from_tables(tables, content_hash=None):
+    statements = {key: Statement.from_table(tables[key]) for key in STATEMENT_KEYS}
+    if tables.get("price") is not None:
+        statements["price"] = Statement.from_table(tables["price"])
+    return StatementSet(content_hash, tables["company_name"], tables["empty_cells"], statements)
+
+
+# Process-wide store: sessions uploading the same workbook share one StatementSet. Large multi-sheet
+# exports are bounded by the byte budget rather than the entry count.
+statement_store = LRUCache(max_entries=64, ttl=6 * 60 * 60,
+                           max_bytes=int(os.environ.get("DCF_STATEMENT_STORE_MAX_BYTES", 512 * 1024 * 1024)),
+                           weigh=lambda statements: statements.nbytes)
+
+
+def load_statements(file_bytes):
+    content_hash = workbook_hash(file_bytes)
+    return statement_store.get_or_compute(
+        content_hash, lambda: statements_from_tables(parse_data_sheet(file_bytes), content_hash))
+
+
+def meta_value(meta, label):
+    return float(meta.loc[label].iloc[0])
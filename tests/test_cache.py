@@ -0,0 +1,61 @@
+import itertools
+
+import cache
+from cache import LRUCache
+
+
+class Blob:
+    def __init__(self, nbytes):
+        self.nbytes = nbytes
+
+
+def test_entry_count_bound_evicts_least_recently_used():
+    lru = LRUCache(max_entries=2)
+    lru.put("a", 1)
+    lru.put("b", 2)
+    lru.get("a")
+    lru.put("c", 3)
+    assert lru.get("b") is None
+    assert (lru.get("a"), lru.get("c")) == (1, 3)
+
+
+def test_byte_budget_evicts_until_the_total_fits():
+    lru = LRUCache(max_entries=64, max_bytes=100, weigh=lambda value: value.nbytes)
+    for key in "abc":
+        lru.put(key, Blob(30))
+    lru.get("a")
+    lru.put("d", Blob(50))
+    assert lru.get("b") is None and lru.get("c") is None
+    assert lru.get("a") is not None and lru.get("d") is not None
+    assert lru.stats()["bytes"] == 80
+
+
+def test_value_larger_than_the_budget_is_not_kept():
+    lru = LRUCache(max_bytes=100, weigh=lambda value: value.nbytes)
+    lru.put("small", Blob(10))
+    lru.put("huge", Blob(500))
+    assert lru.get("huge") is None
+    assert lru.get("small") is not None
+    assert lru.stats()["bytes"] == 10
+
+
+def test_replacing_and_expiring_entries_release_their_bytes(monkeypatch):
+    ticks = itertools.count()
+    monkeypatch.setattr(cache.time, "monotonic", lambda: float(next(ticks)))
+    lru = LRUCache(ttl=5, max_bytes=100, weigh=lambda value: value.nbytes)
+    lru.put("a", Blob(40))
+    lru.put("a", Blob(60))
+    assert lru.stats()["bytes"] == 60
+    for _ in range(10):
+        next(ticks)
+    assert lru.get("a") is None
+    assert lru.stats()["bytes"] == 0
+
+
+def test_get_or_compute_only_computes_on_a_miss():
+    lru = LRUCache()
+    calls = []
+    for _ in range(3):
+        assert lru.get_or_compute("k", lambda: calls.append(1) or "value") == "value"
+    assert len(calls) == 1
+    assert (lru.stats()["hits"], lru.stats()["misses"]) == (2, 1)
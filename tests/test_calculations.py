@@ -0,0 +1,180 @@
+import math
+
+import numpy as np
+import pytest
+
+from calculations import calculate_dcf, calculate_terminal_value, dcf_batch, dcf_fair_value
+
+
+# Scalar implementations from before the NumPy engine, kept verbatim as the reference
+def reference_calculate_dcf(base_revenue, forecast_years, ebit_margin, depreciation_pct, capex_pct,
+                            interest_pct, wc_change_pct, tax_rate, shares, growth_rate_1_2,
+                            growth_rate_3_4_5, growth_rate_6):
+    discount_factors = [(1 + interest_pct / 100) ** year for year in range(1, forecast_years + 1)]
+    fcf_data = []
+    revenue = base_revenue
+    ebit = base_revenue * (ebit_margin / 100)
+    depreciation = base_revenue * (depreciation_pct / 100)
+    tax = ebit * (tax_rate / 100)
+    net_op_pat = ebit - tax
+    fcf_data.append(["Year 0", base_revenue, ebit, tax, net_op_pat, depreciation, 0, 0, 0, 0])
+
+    for year in range(1, forecast_years + 1):
+        if year <= 2:
+            revenue *= (1 + growth_rate_1_2 / 100)
+        elif year <= 5:
+            revenue *= (1 + growth_rate_3_4_5 / 100)
+        else:
+            revenue *= (1 + growth_rate_6 / 100)
+
+        ebit = revenue * (ebit_margin / 100)
+        depreciation = revenue * (depreciation_pct / 100)
+        tax = ebit * (tax_rate / 100)
+        net_op_pat = ebit - tax
+        capex = revenue * (capex_pct / 100)
+        wc_change = revenue * wc_change_pct / 100
+        fcf = net_op_pat + depreciation - capex - wc_change
+        pv_fcf = fcf / discount_factors[year - 1]
+        fcf_data.append([f"Year {year}", revenue, ebit, tax, net_op_pat, depreciation, capex, wc_change, fcf, pv_fcf])
+
+    return fcf_data
+
+
+def reference_calculate_terminal_value(fcf, g, r, n):
+    tv = (fcf * (1 + g / 100)) / ((r / 100) - (g / 100))
+    return tv / ((1 + r / 100) ** n), tv
+
+
+def reference_dcf_fair_value(base_revenue, forecast_years, ebit_margin, depreciation_pct, capex_pct, wc_change_pct,
+                             tax_rate, interest_pct, shares, growth_1_5, growth_6, terminal_growth):
+    revenue = base_revenue
+    total_pv_fcf = 0
+    for year in range(1, forecast_years + 1):
+        revenue *= (1 + growth_1_5 / 100)
+        ebit = revenue * (ebit_margin / 100)
+        tax = ebit * (tax_rate / 100)
+        dep = revenue * (depreciation_pct / 100)
+        capex = revenue * (capex_pct / 100)
+        wc = revenue * (wc_change_pct / 100)
+        fcf = ebit - tax + dep - capex - wc
+        pv_fcf = fcf / ((1 + interest_pct / 100) ** year)
+        total_pv_fcf += pv_fcf
+
+    final_fcf = fcf
+    pv_terminal, terminal_val = reference_calculate_terminal_value(final_fcf, terminal_growth, interest_pct,
+                                                                   forecast_years)
+    ev = total_pv_fcf + pv_terminal
+    fv_per_share = ev / shares if shares else 0
+    terminal_weight = pv_terminal / ev * 100 if ev else 0
+    return fv_per_share, terminal_weight
+
+
+def random_inputs(seed, count=200):
+    rng = np.random.default_rng(seed)
+    for _ in range(count):
+        interest_pct = float(rng.uniform(6, 16))
+        yield {
+            "base_revenue": float(rng.uniform(10, 1e6)),
+            "forecast_years": int(rng.integers(1, 16)),
+            "ebit_margin": float(rng.uniform(-10, 40)),
+            "depreciation_pct": float(rng.uniform(0, 10)),
+            "capex_pct": float(rng.uniform(0, 10)),
+            "wc_change_pct": float(rng.uniform(-2, 5)),
+            "tax_rate": float(rng.uniform(0, 35)),
+            "interest_pct": interest_pct,
+            "shares": float(rng.uniform(0.1, 100)),
+            "growth_1_2": float(rng.uniform(-10, 40)),
+            "growth_3_4_5": float(rng.uniform(-10, 30)),
+            "growth_6": float(rng.uniform(-5, 20)),
+            # Keep the Gordon denominator away from zero; the equal case is tested on its own
+            "terminal_growth": float(interest_pct - rng.uniform(0.5, 8)),
+        }
+
+
+@pytest.mark.parametrize("inputs", list(random_inputs(1)))
+def test_calculate_dcf_matches_reference(inputs):
+    args = (inputs["base_revenue"], inputs["forecast_years"], inputs["ebit_margin"], inputs["depreciation_pct"],
+            inputs["capex_pct"], inputs["interest_pct"], inputs["wc_change_pct"], inputs["tax_rate"],
+            inputs["shares"], inputs["growth_1_2"], inputs["growth_3_4_5"], inputs["growth_6"])
+    expected = reference_calculate_dcf(*args)
+    actual = calculate_dcf(*args)
+    assert len(actual) == len(expected)
+    for actual_row, expected_row in zip(actual, expected):
+        assert actual_row[0] == expected_row[0]
+        np.testing.assert_allclose(actual_row[1:], expected_row[1:], rtol=1e-9, atol=1e-9)
+
+
+@pytest.mark.parametrize("inputs", list(random_inputs(2)))
+def test_dcf_fair_value_matches_reference(inputs):
+    args = (inputs["base_revenue"], inputs["forecast_years"], inputs["ebit_margin"], inputs["depreciation_pct"],
+            inputs["capex_pct"], inputs["wc_change_pct"], inputs["tax_rate"], inputs["interest_pct"],
+            inputs["shares"], inputs["growth_1_2"], inputs["growth_6"], inputs["terminal_growth"])
+    expected_value, expected_weight = reference_dcf_fair_value(*args)
+    value, weight = dcf_fair_value(*args)
+    assert value == pytest.approx(expected_value, rel=1e-9, abs=1e-9)
+    assert weight == pytest.approx(expected_weight, rel=1e-9, abs=1e-9)
+
+
+def test_dcf_fair_value_zero_shares_and_short_horizons():
+    for years in (1, 2):
+        expected = reference_dcf_fair_value(1000.0, years, 20, 3, 2, 1, 25, 11, 10, 12, 12, 4)
+        assert dcf_fair_value(1000.0, years, 20, 3, 2, 1, 25, 11, 10, 12, 12, 4) == pytest.approx(expected, rel=1e-9)
+    assert dcf_fair_value(1000.0, 5, 20, 3, 2, 1, 25, 11, 0, 12, 12, 4)[0] == 0
+
+
+def test_calculate_terminal_value_matches_reference():
+    for fcf, g, r, n in [(120.0, 4, 10, 5), (-35.5, 2.5, 8, 12), (1e6, -3, 14, 1)]:
+        assert calculate_terminal_value(fcf, g, r, n) == pytest.approx(reference_calculate_terminal_value(fcf, g, r, n),
+                                                                       rel=1e-12)
+
+
+# The scalar code divided by zero here; the engine returns an infinite terminal value instead
+def test_wacc_equal_to_terminal_growth_is_infinite():
+    args = (1000.0, 5, 20, 3, 2, 1, 25, 10, 10, 12, 12, 10)
+    with pytest.raises(ZeroDivisionError):
+        reference_dcf_fair_value(*args)
+    value, _ = dcf_fair_value(*args)
+    assert math.isinf(value) and value > 0
+
+    pv_terminal, tv = calculate_terminal_value(100.0, 10, 10, 5)
+    assert math.isinf(pv_terminal) and math.isinf(tv)
+
+
+def test_grid_matches_reference_cell_by_cell():
+    waccs = np.array([7.0, 9.0, 11.0, 13.0])
+    terminal_growths = np.array([2.0, 4.0, 5.5])
+    result = dcf_batch(5000.0, 8, 18, 4, 3, 2, 25, waccs[:, None], 12, 12, 12, terminal_growths[None, :], 7.5)
+    for i, wacc in enumerate(waccs):
+        for j, terminal_growth in enumerate(terminal_growths):
+            expected, _ = reference_dcf_fair_value(5000.0, 8, 18, 4, 3, 2, 25, wacc, 7.5, 12, 12, terminal_growth)
+            assert result["fair_value"][i, j] == pytest.approx(expected, rel=1e-9)
+
+
+def _closed_form_and_loop(seed, size=5000):
+    rng = np.random.default_rng(seed)
+    interest_pct = rng.uniform(6, 16, size)
+    growth = [rng.uniform(-10, 40, size), rng.uniform(-10, 30, size), rng.uniform(-5, 20, size)]
+    # A third of the phase growth rates sit exactly on WACC, where the geometric ratio is 1
+    for phase in growth:
+        on_wacc = rng.random(size) < 1 / 3
+        phase[on_wacc] = interest_pct[on_wacc]
+    args = (rng.uniform(10, 1e6, size), rng.integers(0, 16, size), rng.uniform(-10, 40, size),
+            rng.uniform(0, 10, size), rng.uniform(0, 10, size), rng.uniform(-2, 5, size), rng.uniform(0, 35, size),
+            interest_pct, *growth, interest_pct - rng.uniform(0.5, 8, size), rng.uniform(0.1, 100, size))
+    return dcf_batch(*args), dcf_batch(*args, table=True)
+
+
+@pytest.mark.parametrize("seed", [3, 4, 5])
+def test_closed_form_matches_year_loop(seed):
+    closed, loop = _closed_form_and_loop(seed)
+    for key in ["total_pv_fcf", "final_fcf", "pv_terminal", "enterprise_value", "fair_value", "terminal_weight"]:
+        np.testing.assert_allclose(closed[key], loop[key], rtol=1e-9, atol=1e-9, err_msg=key)
+
+
+def test_closed_form_short_horizons_and_growth_on_wacc():
+    for years in (0, 1, 2):
+        for growth in (10.0, 12.0):
+            args = (1000.0, years, 20, 3, 2, 1, 25, 10.0, growth, growth, growth, 4, 10)
+            closed, loop = dcf_batch(*args), dcf_batch(*args, table=True)
+            for key in ["total_pv_fcf", "final_fcf", "fair_value"]:
+                assert float(closed[key]) == pytest.approx(float(loop[key]), rel=1e-9, abs=1e-9)
@@ -0,0 +1,56 @@
+import pytest
+
+from benchmarks.synthetic_workbook import data_sheet_bytes
+from calculations import DEFAULT_ASSUMPTIONS
+from dcf_graph import DCF_SOURCES, build_dcf_graph
+from file_loader import parse_data_sheet
+from statement_store import statements_from_tables
+
+
+@pytest.fixture(scope="module")
+def frames():
+    return statements_from_tables(parse_data_sheet(data_sheet_bytes(seed=7))).frames()
+
+
+@pytest.fixture
+def sources(frames):
+    sources = {**DEFAULT_ASSUMPTIONS, "annual_pl": frames["annual_pl"], "meta": frames["meta"], "ebit_margin": 18.0,
+               "depreciation_pct": 4.0, "tax_rate": 25.0, "shares_outstanding": 12.5}
+    return {key: sources[key] for key in DCF_SOURCES}
+
+
+@pytest.fixture
+def graph(sources):
+    graph = build_dcf_graph()
+    graph.evaluate(graph.nodes, sources)
+    assert sorted(graph.recomputed) == sorted(graph.nodes)
+    return graph
+
+
+def test_unchanged_inputs_recompute_nothing(graph, sources):
+    first = graph.evaluate(graph.nodes, dict(sources))
+    assert graph.recomputed == []
+    assert graph.evaluate(graph.nodes, dict(sources))["fcf_table"] is first["fcf_table"]
+
+
+def test_capex_change_skips_the_statement_nodes(graph, sources):
+    graph.evaluate(graph.nodes, {**sources, "capex_pct": 5.5})
+    assert set(graph.recomputed) == {"fcf_table", "valuation", "base_value", "growth_sensitivity",
+                                     "wacc_terminal_sensitivity", "ebit_terminal_sensitivity"}
+    assert "base_revenue" not in graph.recomputed and "current_price" not in graph.recomputed
+
+
+def test_wacc_change_keeps_the_wacc_grid_memoized(graph, sources):
+    graph.evaluate(graph.nodes, {**sources, "interest_pct": 13.0})
+    assert "wacc_terminal_sensitivity" not in graph.recomputed
+    assert {"fcf_table", "valuation", "base_value", "growth_sensitivity",
+            "ebit_terminal_sensitivity"} <= set(graph.recomputed)
+
+
+# Frames are compared by identity, so a re-uploaded statement recomputes even with equal contents
+def test_new_frame_object_recomputes_base_revenue(graph, sources):
+    graph.evaluate(graph.nodes, {**sources, "annual_pl": sources["annual_pl"].copy()})
+    assert "base_revenue" in graph.recomputed
+    assert "current_price" not in graph.recomputed
+    # Same revenue value, so nothing downstream of base_revenue recomputes
+    assert "valuation" not in graph.recomputed
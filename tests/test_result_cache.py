@@ -0,0 +1,118 @@
+import itertools
+import json
+import sqlite3
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import result_cache
+from benchmarks.synthetic_workbook import data_sheet_bytes
+from calculations import DEFAULT_ASSUMPTIONS
+from dcf_graph import DCF_SOURCES, build_dcf_graph
+from file_loader import parse_data_sheet
+from result_cache import ResultCache, _decode, _encode
+from statement_store import statements_from_tables
+
+
+@pytest.fixture(scope="module")
+def dcf():
+    frames = statements_from_tables(parse_data_sheet(data_sheet_bytes(seed=7))).frames()
+    sources = {**DEFAULT_ASSUMPTIONS, "annual_pl": frames["annual_pl"], "meta": frames["meta"], "ebit_margin": 18.0,
+               "depreciation_pct": 4.0, "tax_rate": 25.0, "shares_outstanding": 12.5}
+    graph = build_dcf_graph()
+    return graph.evaluate(graph.nodes, {key: sources[key] for key in DCF_SOURCES})
+
+
+# Every access gets a later timestamp, so LRU order doesn't depend on the clock resolution
+@pytest.fixture
+def clock(monkeypatch):
+    ticks = itertools.count(1)
+    monkeypatch.setattr(result_cache.time, "time", lambda: float(next(ticks)))
+
+
+def _assert_same(expected, actual):
+    if isinstance(expected, pd.DataFrame):
+        pd.testing.assert_frame_equal(actual, expected, check_index_type=False)
+    elif isinstance(expected, dict):
+        assert expected.keys() == actual.keys()
+        for key in expected:
+            _assert_same(expected[key], actual[key])
+    else:
+        assert expected == actual or (np.isnan(expected) and np.isnan(actual))
+
+
+def test_encode_round_trips_the_dcf_results(dcf):
+    assert isinstance(dcf["fcf_table"].index, pd.RangeIndex)
+    # The 7% WACC x 7% terminal growth cell has no finite terminal value
+    assert np.isinf(dcf["wacc_terminal_sensitivity"].to_numpy()).any()
+    dcf = {**dcf, "with_nan": pd.DataFrame({"a": [1.0, np.nan, -np.inf]}, index=pd.Index(["x", "y", "z"], name="row"))}
+    _assert_same(dcf, _decode(json.loads(json.dumps(_encode(dcf)))))
+
+
+def test_put_get_round_trip(tmp_path, dcf):
+    cache = ResultCache(str(tmp_path / "results.sqlite"))
+    cache.put("k", dcf)
+    _assert_same(dcf, cache.get("k"))
+    assert (cache.hits, cache.misses) == (1, 0)
+
+
+def test_other_model_versions_are_not_served(tmp_path):
+    path = str(tmp_path / "results.sqlite")
+    old, new = ResultCache(path, version="1"), ResultCache(path, version="2")
+    old.put("k", {"fair_value": 1.0})
+    assert new.get("k") is None
+    new.put("k", {"fair_value": 2.0})
+    # Both versions keep their own entry while they run side by side
+    assert old.get("k") == {"fair_value": 1.0}
+    assert new.get("k") == {"fair_value": 2.0}
+
+
+def test_stale_versions_are_evicted_first(tmp_path, clock):
+    path = str(tmp_path / "results.sqlite")
+    value = {"payload": "x" * 100}
+    size = len(json.dumps(value))
+    ResultCache(path, max_bytes=3 * size, version="1").put("old", value)
+    new = ResultCache(path, max_bytes=3 * size, version="2")
+    for key in ["a", "b", "c"]:
+        new.put(key, value)
+    assert new.stats()["entries"] == 3
+    assert ResultCache(path, version="1").get("old") is None
+
+
+def test_least_recently_read_entries_are_evicted(tmp_path, clock):
+    value = {"payload": "x" * 100}
+    cache = ResultCache(str(tmp_path / "results.sqlite"), max_bytes=3 * len(json.dumps(value)))
+    for key in ["a", "b", "c"]:
+        cache.put(key, value)
+    cache.get("a")
+    cache.put("d", value)
+    assert cache.get("b") is None
+    assert all(cache.get(key) == value for key in ["a", "c", "d"])
+
+
+def test_payload_larger_than_the_cache_is_not_stored(tmp_path):
+    cache = ResultCache(str(tmp_path / "results.sqlite"), max_bytes=10)
+    cache.put("k", {"payload": "x" * 100})
+    assert cache.get("k") is None
+
+
+def test_corrupt_row_is_a_miss_and_removed(tmp_path):
+    path = str(tmp_path / "results.sqlite")
+    cache = ResultCache(path)
+    cache.put("k", {"fair_value": 1.0})
+    conn = sqlite3.connect(path)
+    with conn:
+        conn.execute("UPDATE results SET payload = ?", (b"\x80\x05not json",))
+    conn.close()
+    assert cache.get("k") is None
+    assert cache.misses == 1
+    assert cache.stats()["entries"] == 0
+
+
+def test_unusable_cache_path_fails_soft():
+    cache = ResultCache("/proc/nope/results.sqlite")
+    assert cache.get("k") is None
+    cache.put("k", {"fair_value": 1.0})
+    stats = cache.stats()
+    assert stats["misses"] == 1 and "error" in stats
@@ -0,0 +1,50 @@
+import numpy as np
+import pytest
+
+from calculations import dcf_fair_value
+from reverse_dcf import implied_assumption
+
+MODEL = {
+    "base_revenue": 5000.0,
+    "forecast_years": 8,
+    "ebit_margin": 18.0,
+    "depreciation_pct": 4.0,
+    "capex_pct": 3.0,
+    "wc_change_pct": 2.0,
+    "tax_rate": 25.0,
+    "interest_pct": 11.0,
+    "shares": 7.5,
+    "growth_1_5": 12.0,
+    "growth_6": 12.0,
+    "terminal_growth": 4.0,
+}
+FTOL = 1e-10
+
+
+@pytest.mark.parametrize("solve_for, true_value", [("growth_1_5", 17.5), ("ebit_margin", 9.25), ("interest_pct", 13.4)])
+def test_solved_assumption_reprices_the_target(solve_for, true_value):
+    target, _ = dcf_fair_value(**{**MODEL, solve_for: true_value})
+    implied = implied_assumption(target, solve_for, MODEL, xtol=0.0, ftol=FTOL)
+    assert implied["bracketed"] and implied["converged"]
+    assert float(implied["value"]) == pytest.approx(true_value, rel=1e-6)
+    fair_value, _ = dcf_fair_value(**{**MODEL, solve_for: float(implied["value"])})
+    assert abs(fair_value - target) <= FTOL * max(abs(target), 1.0)
+
+
+@pytest.mark.parametrize("solve_for", ["growth_1_5", "ebit_margin", "interest_pct"])
+def test_unbracketed_target_is_nan(solve_for):
+    implied = implied_assumption(1e12, solve_for, MODEL)
+    assert not implied["bracketed"] and not implied["converged"]
+    assert np.isnan(implied["value"]) and np.isnan(implied["residual"])
+
+
+def test_wacc_surface_matches_scalar_solves():
+    waccs = np.arange(7.0, 14.0)
+    target, _ = dcf_fair_value(**MODEL)
+    surface = implied_assumption(target, "growth_1_5", {**MODEL, "interest_pct": waccs})
+    assert surface["value"].shape == waccs.shape
+    for i, wacc in enumerate(waccs):
+        scalar = implied_assumption(target, "growth_1_5", {**MODEL, "interest_pct": wacc})
+        assert bool(surface["bracketed"][i]) == bool(scalar["bracketed"])
+        np.testing.assert_allclose(surface["value"][i], scalar["value"], rtol=1e-9)
+        assert surface["iterations"][i] == scalar["iterations"]
@@ -0,0 +1,94 @@
+import numpy as np
+import pandas as pd
+
+from calculations import dcf_batch
+
+# Inputs-tab assumptions the tornado shocks (session-state key -> label)
+TORNADO_ASSUMPTIONS = {
+    "user_growth_rate_yr_1_2": "Growth Y1 & Y2 (%)",
+    "user_growth_rate_yr_3_4_5": "Growth Y3 to Y5 (%)",
+    "user_growth_rate_yr_6_onwards": "Terminal Growth Rate (%)",
+    "ebit_margin": "EBIT Margin (%)",
+    "depreciation_pct": "Depreciation (% of Revenue)",
+    "tax_rate": "Tax Rate (%)",
+    "capex_pct": "CapEx (% of Revenue)",
+    "wc_change_pct": "Working Capital Changes (% of Revenue)",
+    "interest_pct": "WACC (%)",
+    "forecast_years": "Forecast Period (Years)",
+}
+
+# Absolute shock applied down and up, in % points (years for the forecast period)
+DEFAULT_SHOCKS = {
+    "user_growth_rate_yr_1_2": 2.0,
+    "user_growth_rate_yr_3_4_5": 2.0,
+    "user_growth_rate_yr_6_onwards": 1.0,
+    "ebit_margin": 2.0,
+    "depreciation_pct": 1.0,
+    "tax_rate": 2.0,
+    "capex_pct": 1.0,
+    "wc_change_pct": 1.0,
+    "interest_pct": 1.0,
+    "forecast_years": 1,
+}
+
+# Relative step for the finite-difference elasticities
+ELASTICITY_STEP = 0.01
+
+
+# Tornado analysis: every assumption shocked down and up on its own (plus, optionally, a small
+# central-difference step for its elasticity), all valued in one dcf_batch call over a stacked
+# scenario axis. Returns one row per assumption, ranked by the fair-value swing.
+def tornado(base_revenue, assumptions, shocks=None, elasticities=False):
+    shocks = {**DEFAULT_SHOCKS, **(shocks or {})}
+    keys = [key for key in TORNADO_ASSUMPTIONS if shocks.get(key)]
+    base = {key: float(assumptions[key]) for key in TORNADO_ASSUMPTIONS}
+    base["forecast_years"] = int(assumptions["forecast_years"])
+
+    # Scenario 0 is the base case, then (down, up) per key, then the elasticity steps
+    deltas = [(key, -shocks[key]) for key in keys] + [(key, shocks[key]) for key in keys]
+    steps = {}
+    if elasticities:
+        for key in keys:
+            if key == "forecast_years":
+                steps[key] = 1
+            else:
+                steps[key] = abs(base[key]) * ELASTICITY_STEP or ELASTICITY_STEP
+            deltas += [(key, -steps[key]), (key, steps[key])]
+    scenarios = {key: np.full(len(deltas) + 1, base[key]) for key in TORNADO_ASSUMPTIONS}
+    for i, (key, delta) in enumerate(deltas, start=1):
+        scenarios[key][i] += delta
+    scenarios["forecast_years"] = np.maximum(scenarios["forecast_years"], 1).astype(int)
+
+    terminal_growth = scenarios["user_growth_rate_yr_6_onwards"]
+    result = dcf_batch(base_revenue, scenarios["forecast_years"], scenarios["ebit_margin"],
+                       scenarios["depreciation_pct"], scenarios["capex_pct"], scenarios["wc_change_pct"],
+                       scenarios["tax_rate"], scenarios["interest_pct"], scenarios["user_growth_rate_yr_1_2"],
+                       scenarios["user_growth_rate_yr_3_4_5"], terminal_growth, terminal_growth,
+                       assumptions["shares_outstanding"])
+    # No finite terminal value once WACC is at or below terminal growth
+    fair_value = np.where(scenarios["interest_pct"] > terminal_growth, result["fair_value"], np.nan)
+
+    base_value = fair_value[0]
+    n = len(keys)
+    low, high = fair_value[1:n + 1], fair_value[n + 1:2 * n + 1]
+    table = pd.DataFrame({
+        "assumption": keys,
+        "label": [TORNADO_ASSUMPTIONS[key] for key in keys],
+        "base": [base[key] for key in keys],
+        "low": [scenarios[key][1 + i] for i, key in enumerate(keys)],
+        "high": [scenarios[key][1 + n + i] for i, key in enumerate(keys)],
+        "fair_value_low": low,
+        "fair_value_high": high,
+    })
+    with np.errstate(divide="ignore", invalid="ignore"):
+        table["change_low_pct"] = (low - base_value) / base_value * 100
+        table["change_high_pct"] = (high - base_value) / base_value * 100
+        table["swing"] = np.abs(high - low)
+        if elasticities:
+            down, up = fair_value[2 * n + 1::2], fair_value[2 * n + 2::2]
+            step = np.array([steps[key] for key in keys], dtype=float)
+            # % change in fair value per 1% change in the assumption
+            table["elasticity"] = (up - down) / (2 * step) * table["base"].to_numpy() / base_value
+    table = table.sort_values("swing", ascending=False, na_position="last").reset_index(drop=True)
+    table.attrs["base_value"] = base_value
+    return table